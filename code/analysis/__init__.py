@@ -10,6 +10,7 @@ from .clustering import DataClustering
 from .predictive_modeling import PredictiveModeling
 from .gap_analysis import GapAnalyzer
 from .report_generator import ReportGenerator
+from .tele2_data import Tele2Data, prepare_tele2_data
 
 __all__ = [
     'CoverageAnalyzer',
@@ -19,5 +20,7 @@ __all__ = [
     'DataClustering',
     'PredictiveModeling',
     'GapAnalyzer',
-    'ReportGenerator'
+    'ReportGenerator',
+    'Tele2Data',
+    'prepare_tele2_data'
 ]
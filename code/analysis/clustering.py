@@ -4,15 +4,34 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN
 from sklearn.decomposition import PCA
-import matplotlib.pyplot as plt
+from sklearn.metrics.pairwise import euclidean_distances
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from typing import Dict, List, Any
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Максимальное количество точек на графике кластеров
+MAX_PLOT_POINTS = 20000
+
+def _kmeans_warm_start(X: np.ndarray, centers: np.ndarray) -> MiniBatchKMeans:
+    """
+    K-means для метода локтя с числом кластеров на единицу больше, чем в centers.
+    
+    Начальные центры - центры предыдущего k и самая удаленная от них точка,
+    поэтому каждое следующее k сходится за несколько итераций.
+    """
+    farthest_idx = euclidean_distances(X, centers, squared=True).min(axis=1).argmax()
+    init = np.vstack([centers, X[farthest_idx]])
+    
+    kmeans = MiniBatchKMeans(n_clusters=len(init), init=init, random_state=42,
+                             batch_size=1024, n_init=1, max_iter=50)
+    kmeans.fit(X)
+    return kmeans
+
 class DataClustering:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -68,14 +87,19 @@ class DataClustering:
         if not available_features:
             return np.array([])
             
-        # Заполнение пропущенных значений
-        X = df[available_features].fillna(0).values
-        
-        # Масштабирование данных
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        return X_scaled
+        # Заполнение пропущенных значений и приведение к float32 за один проход
+        X = df[available_features].to_numpy(dtype=np.float32, na_value=0.0)
+        
+        # Масштабирование данных (аналог StandardScaler на месте).
+        # Параметры вычисляются по данным каждого вызова: другой город или обновленный
+        # набор данных масштабируется по собственным статистикам
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        std[std < 1e-12] = 1.0
+        X -= mean
+        X /= std
+        
+        return X
     
     def _kmeans_clustering(self, X: np.ndarray) -> Dict[str, Any]:
         """Кластеризация методом K-means."""
@@ -83,16 +107,22 @@ class DataClustering:
         wcss = []
         max_clusters = min(10, len(X))
         
-        for i in range(1, max_clusters + 1):
-            kmeans = KMeans(n_clusters=i, random_state=42)
-            kmeans.fit(X)
-            wcss.append(kmeans.inertia_)
+        # Для одного кластера центр - среднее, решение находится без итераций
+        centers = X.mean(axis=0, keepdims=True)
+        wcss.append(float(((X - centers) ** 2).sum()))
+        
+        # Каждое следующее k начинается с центров предыдущего (в текущем процессе:
+        # модели последовательно зависят друг от друга, а X не копируется в рабочие процессы)
+        for _ in range(2, max_clusters + 1):
+            kmeans = _kmeans_warm_start(X, centers)
+            centers = kmeans.cluster_centers_
+            wcss.append(float(kmeans.inertia_))
         
         # Выбор оптимального количества кластеров (упрощенная версия)
         optimal_clusters = 3  # В реальном проекте нужно использовать более сложный метод
         
-        # Кластеризация с оптимальным количеством кластеров
-        kmeans = KMeans(n_clusters=optimal_clusters, random_state=42)
+        # Кластеризация с оптимальным количеством кластеров (точный алгоритм Элкана)
+        kmeans = KMeans(n_clusters=optimal_clusters, random_state=42, algorithm='elkan', n_init=1, max_iter=100)
         labels = kmeans.fit_predict(X)
         
         return {
@@ -106,7 +136,7 @@ class DataClustering:
     def _dbscan_clustering(self, X: np.ndarray) -> Dict[str, Any]:
         """Кластеризация методом DBSCAN."""
         # Кластеризация DBSCAN
-        dbscan = DBSCAN(eps=0.5, min_samples=5)
+        dbscan = DBSCAN(eps=0.5, min_samples=5, algorithm='ball_tree', leaf_size=40, n_jobs=-1)
         labels = dbscan.fit_predict(X)
         
         # Количество кластеров (исключая шум)
@@ -124,43 +154,61 @@ class DataClustering:
         if len(X) == 0 or len(labels) == 0:
             return
             
+        # Стратифицированная по меткам подвыборка: для графика достаточно
+        # ограниченного числа точек, а PCA обучается линейно быстрее
+        labels = np.asarray(labels)
+        if len(X) > MAX_PLOT_POINTS:
+            sample_idx = pd.Series(np.arange(len(X))).groupby(labels).sample(
+                frac=MAX_PLOT_POINTS / len(X), random_state=0
+            ).to_numpy()
+            X, labels = X[sample_idx], labels[sample_idx]
+        
         # Уменьшение размерности для визуализации
-        pca = PCA(n_components=2)
+        pca = PCA(n_components=2, svd_solver='randomized', random_state=0)
         X_reduced = pca.fit_transform(X)
         
-        # Создание графика
-        plt.figure(figsize=(10, 7))
-        scatter = plt.scatter(X_reduced[:, 0], X_reduced[:, 1], c=labels, cmap='viridis', alpha=0.6)
-        plt.colorbar(scatter)
-        plt.title(f'Кластеризация методом {method.upper()}')
-        plt.xlabel('Компонента 1')
-        plt.ylabel('Компонента 2')
+        # Создание графика: отдельная фигура с холстом Agg, без глобального состояния pyplot
+        fig = Figure(figsize=(10, 7))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        scatter = ax.scatter(X_reduced[:, 0], X_reduced[:, 1], c=labels, cmap='viridis', alpha=0.6,
+                             s=4, linewidths=0, rasterized=True)
+        fig.colorbar(scatter, ax=ax)
+        ax.set_title(f'Кластеризация методом {method.upper()}')
+        ax.set_xlabel('Компонента 1')
+        ax.set_ylabel('Компонента 2')
         
         # Сохранение графика
         import os
         os.makedirs('reports/visualizations', exist_ok=True)
-        plt.savefig(f'reports/visualizations/{method}_clustering.png')
-        plt.close()
+        fig.savefig(f'reports/visualizations/{method}_clustering.png', dpi=100)
     
     def _interpret_clusters(self, df: pd.DataFrame, labels: List[int]) -> Dict[str, Any]:
         """Интерпретация результатов кластеризации."""
         if len(labels) == 0 or len(df) != len(labels):
             return {}
             
-        df = df.copy()
-        df['cluster'] = labels
+        # Агрегаты по всем кластерам за один проход
+        cluster_labels = np.asarray(labels)
+        grouped = df.groupby(cluster_labels)
+        sizes = grouped.size()
+        mean_columns = [col for col in ['rating', 'reviews_count'] if col in df.columns]
+        means = grouped[mean_columns].mean() if mean_columns else None
+        city_counts = df.groupby([cluster_labels, 'city'], observed=True).size()
+        cities = {
+            cluster_id: counts.droplevel(0).sort_values(ascending=False).to_dict()
+            for cluster_id, counts in city_counts.groupby(level=0)
+        }
         
         interpretation = {}
         
-        for cluster_id in set(labels):
-            cluster_df = df[df['cluster'] == cluster_id]
-            
+        for cluster_id in sizes.index:
             # Характеристики кластера
-            interpretation[cluster_id] = {
-                'size': len(cluster_df),
-                'avg_rating': cluster_df['rating'].mean() if 'rating' in cluster_df.columns else 0,
-                'avg_reviews': cluster_df['reviews_count'].mean() if 'reviews_count' in cluster_df.columns else 0,
-                'cities': cluster_df['city'].value_counts().to_dict()
+            interpretation[int(cluster_id)] = {
+                'size': int(sizes.loc[cluster_id]),
+                'avg_rating': means.loc[cluster_id, 'rating'] if 'rating' in mean_columns else 0,
+                'avg_reviews': means.loc[cluster_id, 'reviews_count'] if 'reviews_count' in mean_columns else 0,
+                'cities': cities.get(cluster_id, {})
             }
         
         return interpretation
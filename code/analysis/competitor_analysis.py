@@ -4,8 +4,11 @@
 
 import pandas as pd
 import numpy as np
+from scipy.spatial import cKDTree
 from typing import Dict, List, Any
 from utils.logger import get_logger
+from utils.geoutils import to_unit_vectors, chord_to_km
+from utils.constants import identify_operators
 
 logger = get_logger(__name__)
 
@@ -26,7 +29,7 @@ class CompetitorAnalyzer:
         logger.info("Запуск анализа конкурентной среды")
         
         # Идентификация операторов
-        df['operator'] = df['name'].apply(self._identify_operator)
+        df['operator'] = identify_operators(df['name'])
         
         # Основные метрики по операторам
         operator_stats = self._calculate_operator_stats(df)
@@ -44,21 +47,6 @@ class CompetitorAnalyzer:
             'recommendations': self._generate_competitor_recommendations(operator_stats, proximity_analysis)
         }
     
-    def _identify_operator(self, name: str) -> str:
-        """Идентификация оператора по названию."""
-        name_lower = str(name).lower()
-        
-        if 'tele2' in name_lower or 'т2' in name_lower:
-            return 'Tele2'
-        elif 'мтс' in name_lower or 'mts' in name_lower:
-            return 'МТС'
-        elif 'билайн' in name_lower or 'beeline' in name_lower:
-            return 'Билайн'
-        elif 'мегафон' in name_lower or 'megafon' in name_lower:
-            return 'МегаФон'
-        else:
-            return 'Другой'
-    
     def _calculate_operator_stats(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Расчет статистики по операторам."""
         if 'operator' not in df.columns:
@@ -79,54 +67,43 @@ class CompetitorAnalyzer:
     
     def _analyze_competitor_proximity(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Анализ близости к конкурентам."""
-        # Фильтрация салонов Т2
-        tele2_df = df[df['operator'] == 'Tele2']
+        # Фильтрация салонов Т2 и конкурентов с известными координатами
+        tele2_df = df[df['operator'] == 'Tele2'].dropna(subset=['latitude', 'longitude'])
+        competitors = df[(df['operator'] != 'Tele2') & 
+                         (df['operator'] != 'Другой')].dropna(subset=['latitude', 'longitude'])
         
         proximity_analysis = {}
         
-        for _, tele2_row in tele2_df.iterrows():
-            if pd.isna(tele2_row['latitude']) or pd.isna(tele2_row['longitude']):
-                continue
-                
-            # Поиск ближайших конкурентов
-            competitors = df[(df['operator'] != 'Tele2') & 
-                            (df['operator'] != 'Другой') &
-                            (~pd.isna(df['latitude'])) & 
-                            (~pd.isna(df['longitude']))]
-            
-            min_distance = float('inf')
-            closest_competitor = None
-            
-            for _, competitor_row in competitors.iterrows():
-                distance = self._calculate_distance(
-                    tele2_row['latitude'], tele2_row['longitude'],
-                    competitor_row['latitude'], competitor_row['longitude']
-                )
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_competitor = competitor_row['operator']
-            
-            location_key = f"{tele2_row['name']} - {tele2_row['address']}"
+        if tele2_df.empty:
+            return proximity_analysis
+        
+        if competitors.empty:
+            closest_competitors = [None] * len(tele2_df)
+            distances = [float('inf')] * len(tele2_df)
+        else:
+            # Поиск ближайших конкурентов по KD-дереву на единичной сфере
+            tree = cKDTree(to_unit_vectors(competitors['latitude'], competitors['longitude']))
+            chord, idx = tree.query(to_unit_vectors(tele2_df['latitude'], tele2_df['longitude']), k=1, workers=-1)
+            closest_competitors = competitors['operator'].to_numpy()[idx]
+            distances = chord_to_km(chord)
+        
+        for name, address, closest_competitor, distance in zip(
+                tele2_df['name'], tele2_df['address'], closest_competitors, distances):
+            location_key = f"{name} - {address}"
             proximity_analysis[location_key] = {
                 'closest_competitor': closest_competitor,
-                'distance_km': min_distance
+                'distance_km': float(distance)
             }
         
         return proximity_analysis
     
-    def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Расчет расстояния между двумя точками."""
-        from geopy.distance import geodesic
-        return geodesic((lat1, lon1), (lat2, lon2)).km
-    
     def _comparative_analysis(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Сравнительный анализ с конкурентами."""
         comparative_data = {}
         
         for metric in ['rating', 'reviews_count', 'photos_count']:
             if metric in df.columns:
-                operator_means = df.groupby('operator')[metric].mean()
+                operator_means = df.groupby('operator', observed=True)[metric].mean()
                 comparative_data[metric] = operator_means.to_dict()
         
         return comparative_data
@@ -4,39 +4,48 @@
 
 import pandas as pd
 import numpy as np
-from geopy.distance import geodesic
 from sklearn.cluster import DBSCAN
 import folium
+from folium import plugins
 from typing import Dict, List, Any, Tuple
 from utils.logger import get_logger
+from utils.geoutils import to_unit_vectors, chord_to_km
+from utils.geodistance import pairwise_haversine_upper, NUMBA_AVAILABLE
+from utils.constants import TELE2_NAME_REGEX
+from analysis.tele2_data import Tele2Data
 
 logger = get_logger(__name__)
 
+# Максимальное число точек в городе, для которого используется JIT-ядро
+JIT_PAIRWISE_MAX_POINTS = 500
+
 class CoverageAnalyzer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.coverage_radius_km = config.get('coverage_radius_km', 1.5)
         
-    def analyze_coverage(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_coverage(self, df: pd.DataFrame, tele2: Tele2Data = None) -> Dict[str, Any]:
         """
         Анализ покрытия дистрибуционной сети.
         
         Args:
             df: DataFrame с данными о салонах связи
+            tele2: Подготовленные данные о салонах Т2 (вычисляются, если не переданы)
             
         Returns:
             Словарь с результатами анализа покрытия
         """
         logger.info("Запуск анализа покрытия дистрибуционной сети")
         
-        # Фильтрация салонов Т2
-        tele2_df = self._filter_tele2_locations(df)
+        # Фильтрация салонов Т2 (маска позиционная: индекс DataFrame может содержать повторы)
+        tele2_mask = tele2.mask if tele2 is not None else self._tele2_mask(df)
+        tele2_df = df[tele2_mask]
         
         # Расчет метрик покрытия
         coverage_metrics = self._calculate_coverage_metrics(tele2_df)
         
         # Выявление пробелов в покрытии
-        gap_analysis = self._identify_coverage_gaps(df, tele2_df)
+        gap_analysis = self._identify_coverage_gaps(df, tele2_mask)
         
         # Анализ по городам
         city_analysis = self._analyze_city_coverage(tele2_df)
@@ -50,7 +59,11 @@ class CoverageAnalyzer:
     
     def _filter_tele2_locations(self, df: pd.DataFrame) -> pd.DataFrame:
         """Фильтрация салонов Т2."""
-        return df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
+        return df[self._tele2_mask(df)]
+    
+    def _tele2_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Булева маска салонов Т2 по названию (по позициям строк)."""
+        return df['name'].str.contains(TELE2_NAME_REGEX, na=False).to_numpy()
     
     def _calculate_coverage_metrics(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Расчет метрик покрытия."""
@@ -77,15 +90,19 @@ class CoverageAnalyzer:
             city_df = df[df['city'] == city]
             if len(city_df) > 1:
                 # Расчет среднего расстояния между салонами в городе
-                coords = city_df[['latitude', 'longitude']].dropna().values
-                distances = []
+                coords = city_df[['latitude', 'longitude']].dropna().to_numpy()
                 
-                for i in range(len(coords)):
-                    for j in range(i + 1, len(coords)):
-                        dist = geodesic(coords[i], coords[j]).km
-                        distances.append(dist)
+                if NUMBA_AVAILABLE and len(coords) <= JIT_PAIRWISE_MAX_POINTS:
+                    # Для небольших городов - JIT-ядро без промежуточной матрицы n×n
+                    distances = pairwise_haversine_upper(coords[:, 0], coords[:, 1])
+                else:
+                    # Попарные расстояния через матрицу Грама единичных векторов:
+                    # |a - b|² = 2 - 2·a·b для точек на единичной сфере
+                    vectors = to_unit_vectors(coords[:, 0], coords[:, 1])
+                    chord = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * (vectors @ vectors.T)))
+                    distances = chord_to_km(chord)[np.triu_indices(len(coords), 1)]
                 
-                if distances:
+                if len(distances) > 0:
                     avg_distance = np.mean(distances)
                     density_metrics[f'{city}_avg_distance_km'] = avg_distance
                     
@@ -99,33 +116,25 @@ class CoverageAnalyzer:
         
         return density_metrics
     
-    def _identify_coverage_gaps(self, all_df: pd.DataFrame, tele2_df: pd.DataFrame) -> Dict[str, Any]:
+    def _identify_coverage_gaps(self, all_df: pd.DataFrame, tele2_mask: np.ndarray) -> Dict[str, Any]:
         """Выявление пробелов в покрытии."""
         # Поиск кластеров всех салонов связи
-        all_coords = all_df[['latitude', 'longitude']].dropna().values
+        valid_mask = all_df['latitude'].notna().to_numpy() & all_df['longitude'].notna().to_numpy()
+        all_coords = all_df.loc[valid_mask, ['latitude', 'longitude']].to_numpy()
         
         if len(all_coords) < 2:
             return {'gap_locations': []}
         
         # Кластеризация для выявления центров спроса
         clustering = DBSCAN(eps=0.02, min_samples=3).fit(all_coords)
-        all_df = all_df.copy()
-        all_df['cluster'] = clustering.labels_
-        
-        # Поиск кластеров без салонов Т2
-        tele2_clusters = set()
-        for _, row in tele2_df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                # Находим ближайший кластер
-                distances = [geodesic((row['latitude'], row['longitude']), center).km 
-                            for center in all_coords]
-                if distances:
-                    min_idx = np.argmin(distances)
-                    tele2_clusters.add(clustering.labels_[min_idx])
+        
+        # Салоны Т2 - подмножество всех салонов, поэтому их кластеры берутся напрямую
+        # из меток по позициям строк (не по индексу, в котором возможны повторы)
+        tele2_clusters = set(clustering.labels_[tele2_mask[valid_mask]])
         
         # Кластеры без салонов Т2
         gap_clusters = set(clustering.labels_) - tele2_clusters
-        gap_coords = all_coords[[i for i, label in enumerate(clustering.labels_) if label in gap_clusters]]
+        gap_coords = all_coords[np.isin(clustering.labels_, list(gap_clusters))]
         
         return {
             'gap_clusters_count': len(gap_clusters),
@@ -176,7 +185,7 @@ class CoverageAnalyzer:
         """Создание карты покрытия."""
         # Фильтрация салонов Т2 и конкурентов
         tele2_df = self._filter_tele2_locations(df)
-        competitors_df = df[~df['name'].str.contains('Tele2|Т2', case=False, na=False)]
+        competitors_df = df[~df['name'].str.contains(TELE2_NAME_REGEX, na=False)]
         
         # Создание базовой карты
         center_lat = tele2_df['latitude'].mean() if not tele2_df.empty else 55.7558
@@ -184,24 +193,26 @@ class CoverageAnalyzer:
         
         coverage_map = folium.Map(location=[center_lat, center_lon], zoom_start=10)
         
-        # Добавление салонов Т2
-        for _, row in tele2_df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                folium.Marker(
-                    [row['latitude'], row['longitude']],
-                    popup=row['name'],
-                    icon=folium.Icon(color='green', icon='info-sign')
-                ).add_to(coverage_map)
-        
-        # Добавление салонов конкурентов
-        for _, row in competitors_df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                folium.Marker(
-                    [row['latitude'], row['longitude']],
-                    popup=row['name'],
-                    icon=folium.Icon(color='red', icon='info-sign')
-                ).add_to(coverage_map)
+        # Добавление салонов Т2 и конкурентов кластерами маркеров
+        self._add_marker_cluster(coverage_map, tele2_df, 'Tele2', 'green')
+        self._add_marker_cluster(coverage_map, competitors_df, 'Конкуренты', 'red')
         
         # Сохранение карты
         coverage_map.save(output_path)
         logger.info(f"Карта покрытия сохранена в {output_path}")
+    
+    def _add_marker_cluster(self, map_obj: folium.Map, df: pd.DataFrame, name: str, color: str) -> None:
+        """Добавление точек на карту одним кластером маркеров."""
+        data = df[['latitude', 'longitude', 'name']].dropna(subset=['latitude', 'longitude'])
+        if data.empty:
+            return
+        
+        callback = (
+            "function (row) {"
+            f"var icon = L.AwesomeMarkers.icon({{markerColor: '{color}', icon: 'info-sign'}});"
+            "var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});"
+            "marker.bindPopup(String(row[2]));"
+            "return marker;"
+            "}"
+        )
+        plugins.FastMarkerCluster(data.to_numpy().tolist(), callback=callback, name=name).add_to(map_obj)
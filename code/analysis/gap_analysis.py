@@ -4,23 +4,31 @@
 
 import pandas as pd
 import numpy as np
-from geopy.distance import geodesic
+from scipy.spatial import cKDTree
 from typing import Dict, List, Any
 from utils.logger import get_logger
+from utils.geoutils import to_unit_vectors, km_to_chord
+from utils.constants import identify_operators
+from utils.geodistance import has_neighbor_within, NUMBA_AVAILABLE
+from analysis.tele2_data import Tele2Data, prepare_tele2_data
 
 logger = get_logger(__name__)
 
+# Максимальное число пар (район, салон Т2), для которого используется JIT-ядро вместо KD-дерева
+JIT_NEIGHBOR_MAX_PAIRS = 1_000_000
+
 class GapAnalyzer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.population_data = self._load_population_data()
         
-    def analyze_gaps(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_gaps(self, df: pd.DataFrame, tele2: Tele2Data = None) -> Dict[str, Any]:
         """
         Анализ пробелов в дистрибуционной сети.
         
         Args:
             df: DataFrame с данными о салонах связи
+            tele2: Подготовленные данные о салонах Т2 (вычисляются, если не переданы)
             
         Returns:
             Словарь с результатами анализа пробелов
@@ -28,16 +36,20 @@ class GapAnalyzer:
         logger.info("Запуск анализа пробелов в дистрибуционной сети")
         
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
+        if tele2 is None:
+            tele2 = prepare_tele2_data(df)
+        
+        # Пространственный индекс салонов Т2 строится один раз для обоих анализов
+        tele2_tree = cKDTree(tele2.vectors)
         
         # Анализ пробелов на основе населения
-        population_gaps = self._analyze_population_gaps(tele2_df)
+        population_gaps = self._analyze_population_gaps(df['city'][tele2.mask].value_counts())
         
         # Анализ пробелов на основе инфраструктуры
-        infrastructure_gaps = self._analyze_infrastructure_gaps(df, tele2_df)
+        infrastructure_gaps = self._analyze_infrastructure_gaps(df, tele2, tele2_tree)
         
         # Анализ конкурентных пробелов
-        competitive_gaps = self._analyze_competitive_gaps(df, tele2_df)
+        competitive_gaps = self._analyze_competitive_gaps(df, tele2, tele2_tree)
         
         return {
             'population_gaps': population_gaps,
@@ -59,13 +71,12 @@ class GapAnalyzer:
             # Добавьте данные для других городов
         }
     
-    def _analyze_population_gaps(self, tele2_df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_population_gaps(self, tele2_city_counts: pd.Series) -> Dict[str, Any]:
         """Анализ пробелов на основе данных о населении."""
         population_gaps = {}
         
         for city, population in self.population_data.items():
-            city_df = tele2_df[tele2_df['city'] == city]
-            location_count = len(city_df)
+            location_count = int(tele2_city_counts.get(city, 0))
             
             # Расчет количества салонов на душу населения
             if population > 0:
@@ -79,127 +90,116 @@ class GapAnalyzer:
         
         return population_gaps
     
-    def _analyze_infrastructure_gaps(self, all_df: pd.DataFrame, tele2_df: pd.DataFrame) -> Dict[str, Any]:
+    def _finite_coords_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Маска строк с заданными (конечными) координатами."""
+        return np.isfinite(df['latitude'].to_numpy(dtype=float)) & np.isfinite(df['longitude'].to_numpy(dtype=float))
+    
+    def _has_nearby_tele2(self, tele2: Tele2Data, tele2_tree: cKDTree, areas: pd.DataFrame,
+                          radius_km: float) -> np.ndarray:
+        """Есть ли салон Т2 в пределах радиуса (км) от каждого района."""
+        if areas.empty:
+            return np.zeros(0, dtype=bool)
+        
+        if NUMBA_AVAILABLE and len(areas) * len(tele2.coords) <= JIT_NEIGHBOR_MAX_PAIRS:
+            # Для небольших выборок - параллельный перебор с выходом на первом совпадении
+            return has_neighbor_within(
+                areas['latitude'].to_numpy(dtype=float), areas['longitude'].to_numpy(dtype=float),
+                tele2.coords[:, 0], tele2.coords[:, 1], radius_km
+            )
+        
+        # Нужен только факт наличия соседа: считаем точки в шаре без их перечисления
+        counts = tele2_tree.query_ball_point(
+            to_unit_vectors(areas['latitude'], areas['longitude']), r=km_to_chord(radius_km),
+            return_length=True, workers=-1
+        )
+        return counts > 0
+    
+    def _analyze_infrastructure_gaps(self, all_df: pd.DataFrame, tele2: Tele2Data, tele2_tree: cKDTree) -> Dict[str, Any]:
         """Анализ пробелов на основе инфраструктуры."""
         infrastructure_gaps = {}
         
-        # Поиск районов с развитой инфраструктурой, но без салонов Т2
+        # Поиск районов с развитой инфраструктурой (и известными координатами), но без салонов Т2
         developed_areas = all_df[
-            (all_df['nearby_shopping_centers_count'] > 2) &
-            (all_df['nearby_metro_count'] > 0) &
-            (all_df['anchor_tenants_count'] > 1)
+            (all_df['nearby_shopping_centers_count'] > 2).to_numpy() &
+            (all_df['nearby_metro_count'] > 0).to_numpy() &
+            (all_df['anchor_tenants_count'] > 1).to_numpy() &
+            self._finite_coords_mask(all_df)
         ]
         
-        # Исключаем районы, где уже есть салоны Т2
-        tele2_coords = tele2_df[['latitude', 'longitude']].dropna().values
-        gap_areas = []
-        
-        for _, area in developed_areas.iterrows():
-            if pd.isna(area['latitude']) or pd.isna(area['longitude']):
-                continue
-                
-            # Проверяем, есть ли поблизости салоны Т2
-            has_nearby_tele2 = False
-            for tele2_coord in tele2_coords:
-                distance = geodesic(
-                    (area['latitude'], area['longitude']),
-                    (tele2_coord[0], tele2_coord[1])
-                ).km
-                
-                if distance < 2.0:  # В радиусе 2 км
-                    has_nearby_tele2 = True
-                    break
-            
-            if not has_nearby_tele2:
-                gap_areas.append({
-                    'location': area['name'] if 'name' in area else 'Неизвестно',
-                    'address': area['address'] if 'address' in area else 'Неизвестно',
-                    'infrastructure_score': self._calculate_infrastructure_score(area)
-                })
+        # Исключаем районы, где уже есть салоны Т2 (в радиусе 2 км)
+        has_nearby_tele2 = self._has_nearby_tele2(tele2, tele2_tree, developed_areas, 2.0)
+        gap_df = developed_areas[~has_nearby_tele2]
+        scores = self._calculate_infrastructure_scores(gap_df)
+        
+        # Сборка результатов по колонкам, без построчного создания Series
+        names = self._column_values(gap_df, 'name')
+        addresses = self._column_values(gap_df, 'address')
+        gap_areas = [{
+            'location': names[i],
+            'address': addresses[i],
+            'infrastructure_score': float(scores[i])
+        } for i in range(len(gap_df))]
         
         infrastructure_gaps['gap_areas'] = gap_areas
         infrastructure_gaps['gap_count'] = len(gap_areas)
         
         return infrastructure_gaps
     
-    def _calculate_infrastructure_score(self, area: pd.Series) -> float:
-        """Расчет оценки инфраструктуры района."""
-        score = 0
-        
-        if area.get('nearby_shopping_centers_count', 0) > 0:
-            score += area['nearby_shopping_centers_count'] * 2
-        
-        if area.get('nearby_metro_count', 0) > 0:
-            score += area['nearby_metro_count'] * 3
-        
-        if area.get('anchor_tenants_count', 0) > 0:
-            score += area['anchor_tenants_count'] * 1.5
-        
-        if area.get('public_transport_stops_count', 0) > 0:
-            score += min(area['public_transport_stops_count'] * 0.5, 3)
-        
-        return score
+    def _calculate_infrastructure_scores(self, areas: pd.DataFrame) -> np.ndarray:
+        """Векторный расчет оценки инфраструктуры районов."""
+        def counts(column: str) -> np.ndarray:
+            # Отсутствующие и отрицательные значения не учитываются в оценке
+            if column not in areas.columns:
+                return np.zeros(len(areas))
+            return np.maximum(areas[column].fillna(0).to_numpy(dtype=float), 0)
+        
+        return (
+            counts('nearby_shopping_centers_count') * 2 +
+            counts('nearby_metro_count') * 3 +
+            counts('anchor_tenants_count') * 1.5 +
+            np.minimum(counts('public_transport_stops_count') * 0.5, 3)
+        )
     
-    def _analyze_competitive_gaps(self, all_df: pd.DataFrame, tele2_df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_competitive_gaps(self, all_df: pd.DataFrame, tele2: Tele2Data, tele2_tree: cKDTree) -> Dict[str, Any]:
         """Анализ конкурентных пробелов."""
         competitive_gaps = {}
         
         # Идентификация операторов
-        all_df['operator'] = all_df['name'].apply(self._identify_operator)
+        all_df['operator'] = identify_operators(all_df['name'])
         
-        # Поиск районов с конкурентами, но без салонов Т2
+        # Поиск районов с конкурентами (и известными координатами), но без салонов Т2
         competitor_areas = all_df[
-            (all_df['operator'].isin(['МТС', 'Билайн', 'МегаФон'])) &
-            (~all_df['operator'].isin(['Tele2', 'Другой']))
+            (all_df['operator'].isin(['МТС', 'Билайн', 'МегаФон'])).to_numpy() &
+            (~all_df['operator'].isin(['Tele2', 'Другой'])).to_numpy() &
+            self._finite_coords_mask(all_df)
         ]
         
-        # Исключаем районы, где уже есть салоны Т2
-        tele2_coords = tele2_df[['latitude', 'longitude']].dropna().values
-        gap_areas = []
-        
-        for _, area in competitor_areas.iterrows():
-            if pd.isna(area['latitude']) or pd.isna(area['longitude']):
-                continue
-                
-            # Проверяем, есть ли поблизости салоны Т2
-            has_nearby_tele2 = False
-            for tele2_coord in tele2_coords:
-                distance = geodesic(
-                    (area['latitude'], area['longitude']),
-                    (tele2_coord[0], tele2_coord[1])
-                ).km
-                
-                if distance < 1.5:  # В радиусе 1.5 км
-                    has_nearby_tele2 = True
-                    break
-            
-            if not has_nearby_tele2:
-                gap_areas.append({
-                    'location': area['name'],
-                    'address': area['address'] if 'address' in area else 'Неизвестно',
-                    'competitor': area['operator'],
-                    'competitor_rating': area.get('rating', 0)
-                })
+        # Исключаем районы, где уже есть салоны Т2 (в радиусе 1.5 км)
+        has_nearby_tele2 = self._has_nearby_tele2(tele2, tele2_tree, competitor_areas, 1.5)
+        gap_df = competitor_areas[~has_nearby_tele2]
+        
+        # Сборка результатов по колонкам, без построчного создания Series
+        names = gap_df['name'].to_numpy(dtype=object)
+        addresses = self._column_values(gap_df, 'address')
+        operators = gap_df['operator'].to_numpy(dtype=object)
+        ratings = self._column_values(gap_df, 'rating', 0)
+        gap_areas = [{
+            'location': names[i],
+            'address': addresses[i],
+            'competitor': operators[i],
+            'competitor_rating': ratings[i]
+        } for i in range(len(gap_df))]
         
         competitive_gaps['gap_areas'] = gap_areas
         competitive_gaps['gap_count'] = len(gap_areas)
         
         return competitive_gaps
     
-    def _identify_operator(self, name: str) -> str:
-        """Идентификация оператора по названию."""
-        name_lower = str(name).lower()
-        
-        if 'tele2' in name_lower or 'т2' in name_lower:
-            return 'Tele2'
-        elif 'мтс' in name_lower or 'mts' in name_lower:
-            return 'МТС'
-        elif 'билайн' in name_lower or 'beeline' in name_lower:
-            return 'Билайн'
-        elif 'мегафон' in name_lower or 'megafon' in name_lower:
-            return 'МегаФон'
-        else:
-            return 'Другой'
+    def _column_values(self, df: pd.DataFrame, column: str, default: Any = 'Неизвестно') -> np.ndarray:
+        """Значения колонки в виде массива (значение по умолчанию, если колонки нет)."""
+        if column not in df.columns:
+            return np.full(len(df), default, dtype=object)
+        return df[column].to_numpy(dtype=object)
     
     def _generate_gap_recommendations(self, population_gaps: Dict[str, Any], 
                                     infrastructure_gaps: Dict[str, Any], 
@@ -2,28 +2,46 @@
 Анализ эффективности локаций.
 """
 
+import os
+import hashlib
+import pickle
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import joblib
+import sklearn
 from typing import Dict, List, Any
 from utils.logger import get_logger
+from analysis.tele2_data import Tele2Data, prepare_tele2_data
 
 logger = get_logger(__name__)
 
+# Границы категорий эффективности и их названия (значения вне (0, 25] не категоризируются)
+EFFICIENCY_BINS = [0, 10, 15, 20, 25]
+EFFICIENCY_LABELS = ['Низкая', 'Средняя', 'Высокая', 'Очень высокая']
+
+# Рекомендации для локаций в порядке столбцов матрицы нарушений
+LOCATION_RECOMMENDATIONS = [
+    "Улучшить качество обслуживания для повышения рейтинга",
+    "Стимулировать клиентов оставлять отзывы",
+    "Улучшить доступность локации",
+    "Рассмотреть возможность размещения в ТЦ"
+]
+
 class LocationAnalyzer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.model = None
         
-    def analyze_efficiency(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def analyze_efficiency(self, df: pd.DataFrame, tele2: Tele2Data = None) -> Dict[str, Any]:
         """
         Анализ эффективности локаций.
         
         Args:
             df: DataFrame с данными о салонах связи
+            tele2: Подготовленные данные о салонах Т2 (вычисляются, если не переданы)
             
         Returns:
             Словарь с результатами анализа эффективности
@@ -31,7 +49,9 @@ class LocationAnalyzer:
         logger.info("Запуск анализа эффективности локаций")
         
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)].copy()
+        if tele2 is None:
+            tele2 = prepare_tele2_data(df)
+        tele2_df = df[tele2.mask].copy()
         
         if len(tele2_df) < 10:
             logger.warning("Недостаточно данных для анализа эффективности")
@@ -47,15 +67,15 @@ class LocationAnalyzer:
         predictions = self.model.predict(X)
         tele2_df['efficiency_score'] = predictions
         
-        # Категоризация эффективности
-        tele2_df['efficiency_category'] = pd.cut(
-            tele2_df['efficiency_score'],
-            bins=[0, 10, 15, 20, 25],
-            labels=['Низкая', 'Средняя', 'Высокая', 'Очень высокая']
+        # Категоризация эффективности: целочисленные номера интервалов (0 - низкая, -1 - вне интервалов)
+        buckets = np.digitize(predictions, EFFICIENCY_BINS, right=True) - 1
+        buckets[buckets >= len(EFFICIENCY_LABELS)] = -1
+        tele2_df['efficiency_category'] = pd.Categorical.from_codes(
+            buckets, categories=EFFICIENCY_LABELS, ordered=True
         )
         
         # Генерация рекомендаций
-        recommendations = self._generate_recommendations(tele2_df)
+        recommendations = self._generate_recommendations(tele2_df, buckets)
         
         return {
             'efficiency_scores': tele2_df[['name', 'address', 'efficiency_score', 'efficiency_category']].to_dict('records'),
@@ -77,10 +97,13 @@ class LocationAnalyzer:
         
         # Оставляем только существующие колонки
         available_columns = [col for col in feature_columns if col in df.columns]
-        X = df[available_columns].fillna(0)
+        X = df[available_columns].astype(np.float32).fillna(0)
         
         # Целевая переменная - комбинация рейтинга и отзывов
-        y = df['rating'].fillna(0) * 2 + np.log1p(df['reviews_count'].fillna(0))
+        # (одинарной точности достаточно для деревьев решений и вдвое меньше по памяти)
+        rating = np.nan_to_num(df['rating'].to_numpy(dtype=np.float32), nan=0.0)
+        reviews = np.nan_to_num(df['reviews_count'].to_numpy(dtype=np.float32), nan=0.0)
+        y = pd.Series(rating * 2 + np.log1p(reviews), index=df.index)
         
         return X, y
     
@@ -88,26 +111,47 @@ class LocationAnalyzer:
         """Обучение или загрузка модели."""
         model_path = self.config.get('model_path', 'models/location_efficiency_model.pkl')
         
+        # Модель сохраняется вместе с отпечатком данных: при тех же данных повторное обучение не нужно
+        fingerprint = self._model_fingerprint(X, y)
+        
+        model = None
         try:
             # Попытка загрузки существующей модели
-            model = joblib.load(model_path)
-            logger.info("Загружена существующая модель")
-        except:
+            artifact = joblib.load(model_path)
+            if isinstance(artifact, dict) and artifact.get('fingerprint') == fingerprint:
+                model = artifact['model']
+                logger.info("Загружена существующая модель")
+            else:
+                logger.info("Сохраненная модель обучена на других данных")
+        except FileNotFoundError:
+            logger.info(f"Сохраненная модель {model_path} не найдена")
+        except (EOFError, pickle.UnpicklingError, ValueError, KeyError, AttributeError, ModuleNotFoundError) as e:
+            # Поврежденный файл или модель, сохраненная несовместимой версией библиотек
+            logger.warning(f"Не удалось загрузить модель из {model_path} ({e})")
+        
+        if model is None:
             # Обучение новой модели
             logger.info("Обучение новой модели")
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
+            model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
             model.fit(X_train, y_train)
             
             # Сохранение модели
-            import os
-            os.makedirs(os.path.dirname(model_path), exist_ok=True)
-            joblib.dump(model, model_path)
+            os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+            joblib.dump({'fingerprint': fingerprint, 'model': model}, model_path)
             logger.info(f"Модель сохранена в {model_path}")
         
         return model
     
+    def _model_fingerprint(self, X: pd.DataFrame, y: pd.Series) -> str:
+        """Отпечаток обучающих данных (признаки и целевая переменная) для ключа кэша модели."""
+        # Версии библиотек входят в ключ: модель, сохраненная другой версией, не загружается
+        digest = hashlib.sha1(f"{sklearn.__version__}:{joblib.__version__}:{sorted(X.columns)}".encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+    
     def _evaluate_model(self, X: pd.DataFrame, y: pd.Series) -> Dict[str, float]:
         """Оценка производительности модели."""
         y_pred = self.model.predict(X)
@@ -131,39 +175,40 @@ class LocationAnalyzer:
             'importance': float(importances[i])
         } for i in indices]
     
-    def _generate_recommendations(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _generate_recommendations(self, df: pd.DataFrame, buckets: np.ndarray) -> List[Dict[str, Any]]:
         """Генерация рекомендаций по оптимизации."""
         recommendations = []
         
         # Анализ точек с низкой эффективностью
-        low_efficiency = df[df['efficiency_category'] == 'Низкая']
+        low_efficiency = df[buckets == 0]
+        
+        names = low_efficiency['name'].to_numpy(dtype=object)
+        addresses = low_efficiency['address'].to_numpy(dtype=object)
+        scores = low_efficiency['efficiency_score'].to_numpy()
+        violations = self._location_violations(low_efficiency)
         
-        for _, row in low_efficiency.iterrows():
+        for i in range(len(low_efficiency)):
             rec = {
-                'location': row['name'],
-                'address': row['address'],
-                'current_score': row['efficiency_score'],
-                'recommendations': self._analyze_single_location(row)
+                'location': names[i],
+                'address': addresses[i],
+                'current_score': scores[i],
+                'recommendations': [LOCATION_RECOMMENDATIONS[j] for j in np.flatnonzero(violations[i])]
             }
             recommendations.append(rec)
         
         return recommendations
     
-    def _analyze_single_location(self, row: pd.Series) -> List[str]:
-        """Анализ отдельной локации и генерация рекомендаций."""
-        recommendations = []
-        
-        # Анализ и рекомендации на основе доступных данных
-        if row.get('rating', 0) < 3:
-            recommendations.append("Улучшить качество обслуживания для повышения рейтинга")
-        
-        if row.get('reviews_count', 0) < 5:
-            recommendations.append("Стимулировать клиентов оставлять отзывы")
-        
-        if row.get('walkability_score', 0) < 5:
-            recommendations.append("Улучшить доступность локации")
-        
-        if row.get('nearby_shopping_centers_count', 0) == 0:
-            recommendations.append("Рассмотреть возможность размещения в ТЦ")
-        
-        return recommendations
+    def _location_violations(self, df: pd.DataFrame) -> np.ndarray:
+        """Матрица нарушений (локации × проверки) для генерации рекомендаций."""
+        def values(column: str) -> np.ndarray:
+            # При отсутствии колонки используется значение 0; пропуски не считаются нарушением
+            if column not in df.columns:
+                return np.zeros(len(df))
+            return df[column].to_numpy(dtype=float)
+        
+        return np.column_stack([
+            values('rating') < 3,
+            values('reviews_count') < 5,
+            values('walkability_score') < 5,
+            values('nearby_shopping_centers_count') == 0
+        ])
@@ -2,30 +2,39 @@
 Прогнозное моделирование для анализа дистрибуции.
 """
 
+import os
+import hashlib
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.base import clone
+from sklearn.model_selection import cross_validate
 from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import make_pipeline
 import joblib
 from typing import Dict, List, Any, Tuple
 from utils.logger import get_logger
+from analysis.tele2_data import Tele2Data, prepare_tele2_data
 
 logger = get_logger(__name__)
 
+# Число фолдов кросс-валидации
+CV_FOLDS = 5
+
 class PredictiveModeling:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.models = {}
+        self.feature_names = None
         
-    def build_models(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def build_models(self, df: pd.DataFrame, tele2: Tele2Data = None) -> Dict[str, Any]:
         """
         Построение прогнозных моделей.
         
         Args:
             df: DataFrame с данными о салонах связи
+            tele2: Подготовленные данные о салонах Т2 (вычисляются, если не переданы)
             
         Returns:
             Словарь с результатами моделирования
@@ -33,14 +42,17 @@ class PredictiveModeling:
         logger.info("Запуск прогнозного моделирования")
         
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)].copy()
+        if tele2 is None:
+            tele2 = prepare_tele2_data(df)
+        tele2_df = df[tele2.mask].copy()
         
         if len(tele2_df) < 20:
             logger.warning("Недостаточно данных для построения моделей")
             return {}
         
         # Подготовка данных
-        X, y = self._prepare_modeling_data(tele2_df)
+        X_raw, y = self._prepare_modeling_data(tele2_df)
+        X = X_raw.fillna(0)
         
         # Построение и оценка моделей
         results = {}
@@ -53,18 +65,26 @@ class PredictiveModeling:
         rf_results = self._build_random_forest(X, y)
         results['random_forest'] = rf_results
         
-        # Градиентный бустинг
-        gb_results = self._build_gradient_boosting(X, y)
+        # Градиентный бустинг (пропуски обрабатываются моделью, заполнение нулями не нужно)
+        gb_results = self._build_gradient_boosting(X_raw, y)
         results['gradient_boosting'] = gb_results
         
+        # Обученные модели (масштабирование входит в конвейер линейной модели);
+        # сохраняются на диск только явным вызовом save_models
+        self.models = {name: model_results['model'] for name, model_results in results.items()}
+        self.feature_names = X.columns
+        
         # Выбор лучшей модели
         best_model = self._select_best_model(results)
         
+        # Важность признаков считается один раз и используется и в отчете, и в рекомендациях
+        feature_importance = self._get_feature_importance(rf_results['model'], X.columns)
+        
         return {
             'model_results': results,
             'best_model': best_model,
-            'feature_importance': self._get_feature_importance(rf_results['model'], X.columns),
-            'recommendations': self._generate_modeling_recommendations(results, best_model)
+            'feature_importance': feature_importance,
+            'recommendations': self._generate_modeling_recommendations(results, best_model, feature_importance)
         }
     
     def _prepare_modeling_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
@@ -79,79 +99,84 @@ class PredictiveModeling:
             'is_modern_facade', 'has_parking', 'has_delivery'
         ]
         
-        # Оставляем только существующие колонки
+        # Оставляем только существующие колонки (пропуски сохраняются, одинарная точность)
         available_columns = [col for col in feature_columns if col in df.columns]
-        X = df[available_columns].fillna(0)
+        X = df[available_columns].astype(np.float32)
         
         # Целевая переменная - оценка эффективности (можно заменить на реальные бизнес-метрики)
-        y = df['rating'].fillna(0) * 2 + np.log1p(df['reviews_count'].fillna(0))
+        rating = np.nan_to_num(df['rating'].to_numpy(dtype=np.float32), nan=0.0)
+        reviews = np.nan_to_num(df['reviews_count'].to_numpy(dtype=np.float32), nan=0.0)
+        y = pd.Series(rating * 2 + np.log1p(reviews), index=df.index)
         
         return X, y
     
     def _build_linear_model(self, X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
         """Построение модели линейной регрессии."""
-        # Масштабирование признаков
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        # Разделение данных
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+        # Масштабирование признаков внутри конвейера: параметры оцениваются
+        # только на обучающих фолдах кросс-валидации
+        model = make_pipeline(StandardScaler(), LinearRegression())
         
-        # Обучение модели
-        model = LinearRegression()
-        model.fit(X_train, y_train)
-        
-        # Оценка модели
-        y_pred = model.predict(X_test)
-        
-        return {
-            'model': model,
-            'mse': mean_squared_error(y_test, y_pred),
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'cross_val_scores': cross_val_score(model, X_scaled, y, cv=5).tolist()
-        }
+        return self._cross_validate_model(model, X, y)
     
     def _build_random_forest(self, X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
         """Построение модели случайного леса."""
-        # Разделение данных
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # Обучение модели
         model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Оценка модели
-        y_pred = model.predict(X_test)
         
-        return {
-            'model': model,
-            'mse': mean_squared_error(y_test, y_pred),
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'cross_val_scores': cross_val_score(model, X, y, cv=5).tolist()
-        }
+        return self._cross_validate_model(model, X, y)
     
     def _build_gradient_boosting(self, X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
         """Построение модели градиентного бустинга."""
-        # Разделение данных
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # Обучение модели
-        model = GradientBoostingRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
+        model = HistGradientBoostingRegressor(max_iter=100, random_state=42)
         
-        # Оценка модели
-        y_pred = model.predict(X_test)
+        return self._cross_validate_model(model, X, y)
+    
+    def _cross_validate_model(self, model: Any, X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
+        """
+        Оценка модели кросс-валидацией и обучение итоговой модели на всех данных.
         
+        Параллелизм только на одном уровне: фолды обучаются параллельно,
+        а итоговая модель использует все ядра, если поддерживает n_jobs.
+        """
+        cv_results = cross_validate(
+            model, X, y, cv=CV_FOLDS, scoring=('neg_mean_squared_error', 'r2'),
+            n_jobs=-1, pre_dispatch='2*n_jobs'
+        )
+        mse = float(-cv_results['test_neg_mean_squared_error'].mean())
+        
+        final_model = clone(model)
+        if 'n_jobs' in final_model.get_params():
+            final_model.set_params(n_jobs=-1)
+        final_model.fit(X, y)
+        
+        # Метрики - средние по фолдам кросс-валидации, модель обучена на всех данных
         return {
-            'model': model,
-            'mse': mean_squared_error(y_test, y_pred),
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'cross_val_scores': cross_val_score(model, X, y, cv=5).tolist()
+            'model': final_model,
+            'evaluation': f'cross_validation_{CV_FOLDS}_folds',
+            'mse': mse,
+            'rmse': np.sqrt(mse),
+            'r2': float(cv_results['test_r2'].mean()),
+            'cross_val_scores': cv_results['test_r2'].tolist()
         }
     
+    def save_models(self, models_dir: str = None) -> None:
+        """
+        Сохранение обученных моделей с ключом по набору признаков.
+        
+        Args:
+            models_dir: Каталог для моделей (по умолчанию models_dir из конфигурации)
+        """
+        if not self.models:
+            raise ValueError("Модели не обучены: сначала вызовите build_models")
+        
+        models_dir = models_dir or self.config.get('models_dir', 'models')
+        key = hashlib.sha1(','.join(self.feature_names).encode()).hexdigest()[:12]
+        
+        os.makedirs(models_dir, exist_ok=True)
+        for name, model in self.models.items():
+            joblib.dump(model, os.path.join(models_dir, f"{name}.{key}.pkl"))
+        
+        logger.info(f"Модели сохранены в {models_dir}")
+    
     def _select_best_model(self, results: Dict[str, Any]) -> str:
         """Выбор лучшей модели на основе R²."""
         best_model = None
@@ -177,7 +202,8 @@ class PredictiveModeling:
         
         return []
     
-    def _generate_modeling_recommendations(self, results: Dict[str, Any], best_model: str) -> List[str]:
+    def _generate_modeling_recommendations(self, results: Dict[str, Any], best_model: str,
+                                           feature_importance: List[Dict[str, Any]]) -> List[str]:
         """Генерация рекомендаций на основе моделирования."""
         recommendations = []
         
@@ -191,19 +217,13 @@ class PredictiveModeling:
         else:
             recommendations.append("Высокая точность моделей. Модели можно использовать для прогнозирования")
         
-        # Рекомендации на основе важности признаков
-        if 'random_forest' in results:
-            feature_importance = self._get_feature_importance(
-                results['random_forest']['model'], 
-                results['random_forest']['model'].feature_names_in_
+        # Рекомендации на основе важности признаков (список уже отсортирован по убыванию)
+        if feature_importance:
+            top_features = feature_importance[:3]
+            recommendations.append(
+                f"Наиболее важные признаки: {', '.join([f['feature'] for f in top_features])}. "
+                "Сфокусируйтесь на улучшении этих параметров"
             )
-            
-            if feature_importance:
-                top_features = feature_importance[:3]
-                recommendations.append(
-                    f"Наиболее важные признаки: {', '.join([f['feature'] for f in top_features])}. "
-                    "Сфокусируйтесь на улучшении этих параметров"
-                )
         
         return recommendations
     
@@ -2,15 +2,53 @@
 Генерация отчетов на основе аналитических данных.
 """
 
-import pandas as pd
+import csv
+import html
 import json
+from string import Template
 from datetime import datetime
+from pathlib import Path
+from heapq import nlargest
+from itertools import chain, islice
 from typing import Dict, List, Any
+import pandas as pd
 from utils.logger import get_logger
 from utils.file_operations import write_json, write_csv
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    # Без pyarrow CSV-отчет всегда пишется модулем csv
+    pa = None
+
 logger = get_logger(__name__)
 
+# Минимальное число строк CSV-отчета, с которого запись идет через pyarrow
+ARROW_CSV_MIN_ROWS = 10_000
+
+# Шапка HTML-дашборда; шаблон разбирается один раз при импорте модуля
+DASHBOARD_HEADER_TEMPLATE = Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Анализ дистрибуционной сети Т2</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 40px; }
+                h1 { color: #333; }
+                .section { margin-bottom: 30px; }
+                .metric { background-color: #f5f5f5; padding: 10px; margin: 5px 0; }
+            </style>
+        </head>
+        <body>
+            <h1>Анализ дистрибуционной сети Т2</h1>
+            <p>Дата генерации: $date</p>
+        """)
+
+# Постоянные блоки краткого резюме в UTF-8
+EXECUTIVE_SUMMARY_HEADER = ("КРАТКОЕ РЕЗЮМЕ АНАЛИЗА ДИСТРИБУЦИОННОЙ СЕТИ Т2\n" + "=" * 60 + "\n").encode('utf-8')
+EXECUTIVE_SUMMARY_RECOMMENDATIONS_HEADER = "\nКЛЮЧЕВЫЕ РЕКОМЕНДАЦИИ:\n\n".encode('utf-8')
+
 class ReportGenerator:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -24,38 +62,39 @@ class ReportGenerator:
             output_dir: Директория для сохранения отчетов
             
         Returns:
-            Словарь с путями к сгенерированным отчетам
+            Словарь с путями к сгенерированным отчетам (отчеты без данных пропускаются)
         """
         logger.info("Генерация отчетов")
         
         report_paths = {}
         
         # Создание директории для отчетов
-        import os
-        os.makedirs(output_dir, exist_ok=True)
+        output = Path(output_dir)
+        output.mkdir(parents=True, exist_ok=True)
         
-        # Генерация различных форматов отчетов
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Время генерации фиксируется один раз и передается во все отчеты
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         
         # JSON-отчет
-        json_report_path = f"{output_dir}/analysis_report_{timestamp}.json"
+        json_report_path = output / f"analysis_report_{timestamp}.json"
         self._generate_json_report(analysis_results, json_report_path)
-        report_paths['json'] = json_report_path
+        report_paths['json'] = str(json_report_path)
         
         # CSV-отчет
-        csv_report_path = f"{output_dir}/analysis_report_{timestamp}.csv"
-        self._generate_csv_report(analysis_results, csv_report_path)
-        report_paths['csv'] = csv_report_path
+        csv_report_path = output / f"analysis_report_{timestamp}.csv"
+        if self._generate_csv_report(analysis_results, csv_report_path):
+            report_paths['csv'] = str(csv_report_path)
         
         # Текстовый отчет
-        text_report_path = f"{output_dir}/analysis_report_{timestamp}.txt"
-        self._generate_text_report(analysis_results, text_report_path)
-        report_paths['text'] = text_report_path
+        text_report_path = output / f"analysis_report_{timestamp}.txt"
+        if self._generate_text_report(analysis_results, text_report_path, now):
+            report_paths['text'] = str(text_report_path)
         
         # Визуальный отчет (дашборд)
-        dashboard_path = f"{output_dir}/dashboard_{timestamp}.html"
-        self._generate_dashboard(analysis_results, dashboard_path)
-        report_paths['dashboard'] = dashboard_path
+        dashboard_path = output / f"dashboard_{timestamp}.html"
+        if self._generate_dashboard(analysis_results, dashboard_path, now):
+            report_paths['dashboard'] = str(dashboard_path)
         
         logger.info(f"Отчеты сохранены в директории {output_dir}")
         return report_paths
@@ -65,133 +104,154 @@ class ReportGenerator:
         write_json(analysis_results, output_path)
         logger.info(f"JSON-отчет сохранен в {output_path}")
     
-    def _generate_csv_report(self, analysis_results: Dict[str, Any], output_path: str) -> None:
-        """Генерация отчета в формате CSV."""
-        # Преобразование данных в плоский формат для CSV
-        csv_data = []
+    def _generate_csv_report(self, analysis_results: Dict[str, Any], output_path: str) -> bool:
+        """Генерация отчета в формате CSV. Возвращает False, если данных для отчета нет."""
+        # Строки формируются прямо из исходных словарей, без промежуточного списка
+        metrics = analysis_results['coverage_analysis'].get('metrics', {}) if 'coverage_analysis' in analysis_results else {}
+        scores = analysis_results['location_analysis'].get('efficiency_scores', []) if 'location_analysis' in analysis_results else []
         
-        # Добавление данных о покрытии
-        if 'coverage_analysis' in analysis_results:
-            coverage = analysis_results['coverage_analysis']
-            for metric, value in coverage.get('metrics', {}).items():
-                csv_data.append({'category': 'coverage', 'metric': metric, 'value': value})
-        
-        # Добавление данных об эффективности
-        if 'location_analysis' in analysis_results:
-            efficiency = analysis_results['location_analysis']
-            for item in efficiency.get('efficiency_scores', []):
-                csv_data.append({
-                    'category': 'efficiency',
-                    'location': item.get('name', ''),
-                    'address': item.get('address', ''),
-                    'score': item.get('efficiency_score', 0),
-                    'category': item.get('efficiency_category', '')
-                })
-        
-        # Сохранение CSV
-        if csv_data:
-            df = pd.DataFrame(csv_data)
-            df.to_csv(output_path, index=False, encoding='utf-8')
-            logger.info(f"CSV-отчет сохранен в {output_path}")
-    
-    def _generate_text_report(self, analysis_results: Dict[str, Any], output_path: str) -> None:
-        """Генерация текстового отчета."""
-        report_lines = []
+        if not metrics and not scores:
+            return False
         
-        # Заголовок отчета
-        report_lines.append("ОТЧЕТ ПО АНАЛИЗУ ДИСТРИБУЦИОННОЙ СЕТИ Т2")
-        report_lines.append("=" * 50)
-        report_lines.append(f"Дата генерации: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append("")
+        # Заголовок - колонки присутствующих разделов в порядке появления
+        header = ['category']
+        if metrics:
+            header += ['metric', 'value']
+        if scores:
+            header += ['location', 'address', 'score']
         
-        # Раздел анализа покрытия
-        if 'coverage_analysis' in analysis_results:
-            coverage = analysis_results['coverage_analysis']
-            report_lines.append("АНАЛИЗ ПОКРЫТИЯ")
-            report_lines.append("-" * 30)
+        def raw_rows():
+            # Данные о покрытии
+            coverage_padding = ('', '', '') if scores else ()
+            for metric, value in metrics.items():
+                yield ('coverage', metric, value) + coverage_padding
             
-            for metric, value in coverage.get('metrics', {}).items():
-                report_lines.append(f"{metric}: {value}")
-            
-            report_lines.append("")
-            report_lines.append("РЕКОМЕНДАЦИИ ПО ПОКРЫТИЮ:")
-            for recommendation in coverage.get('recommendations', []):
-                report_lines.append(f"- {recommendation}")
-            
-            report_lines.append("")
+            # Данные об эффективности (в колонке category - категория эффективности)
+            efficiency_padding = ('', '') if metrics else ()
+            for item in scores:
+                yield ((item.get('efficiency_category', ''),) + efficiency_padding +
+                       (item.get('name', ''), item.get('address', ''), item.get('efficiency_score', 0)))
+        
+        def rows():
+            # Отсутствующие значения (None, NaN) записываются пустой строкой в обеих ветках
+            for row in raw_rows():
+                yield tuple('' if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)) else value
+                            for value in row)
+        
+        # Одинаковый формат в обеих ветках: все значения и заголовок в кавычках
+        # (pyarrow заключает в кавычки каждую строку), строки разделяются '\n'
+        if pa is not None and len(metrics) + len(scores) >= ARROW_CSV_MIN_ROWS:
+            # Колонки приводятся к строкам, т.к. значения одной колонки могут иметь разные типы
+            table = pa.table({
+                key: pa.array([str(value) for value in column], type=pa.string())
+                for key, column in zip(header, zip(*rows()))
+            })
+            pacsv.write_csv(table, output_path, write_options=pacsv.WriteOptions(batch_size=65536))
+        else:
+            with open(output_path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+                writer.writerow(header)
+                writer.writerows(rows())
+        
+        logger.info(f"CSV-отчет сохранен в {output_path}")
+        return True
+    
+    def _generate_text_report(self, analysis_results: Dict[str, Any], output_path: str, now: datetime = None) -> bool:
+        """Генерация текстового отчета. Возвращает False, если данных для отчета нет."""
+        # Без разделов покрытия и эффективности файл не создается
+        if 'coverage_analysis' not in analysis_results and 'location_analysis' not in analysis_results:
+            return False
         
-        # Раздел анализа эффективности
-        if 'location_analysis' in analysis_results:
-            efficiency = analysis_results['location_analysis']
-            report_lines.append("АНАЛИЗ ЭФФЕКТИВНОСТИ ЛОКАЦИЙ")
-            report_lines.append("-" * 40)
+        generated_at = (now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Строки пишутся сразу в буферизованный файл, без сборки всего текста в памяти
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            write = f.write
             
-            # Топ-5 самых эффективных локаций
-            efficiency_scores = efficiency.get('efficiency_scores', [])
-            if efficiency_scores:
-                sorted_scores = sorted(efficiency_scores, key=lambda x: x.get('efficiency_score', 0), reverse=True)
-                report_lines.append("Топ-5 самых эффективных локаций:")
-                for i, item in enumerate(sorted_scores[:5], 1):
-                    report_lines.append(f"{i}. {item.get('name', '')} - {item.get('efficiency_score', 0):.2f}")
+            # Заголовок отчета
+            write("ОТЧЕТ ПО АНАЛИЗУ ДИСТРИБУЦИОННОЙ СЕТИ Т2\n")
+            write("=" * 50 + "\n")
+            write(f"Дата генерации: {generated_at}\n")
+            write("\n")
             
-            report_lines.append("")
-            report_lines.append("РЕКОМЕНДАЦИИ ПО ЭФФЕКТИВНОСТИ:")
-            for recommendation in efficiency.get('recommendations', []):
-                report_lines.append(f"- {recommendation}")
+            # Раздел анализа покрытия
+            if 'coverage_analysis' in analysis_results:
+                coverage = analysis_results['coverage_analysis']
+                write("АНАЛИЗ ПОКРЫТИЯ\n")
+                write("-" * 30 + "\n")
+                
+                for metric, value in coverage.get('metrics', {}).items():
+                    write(f"{metric}: {value}\n")
+                
+                write("\n")
+                write("РЕКОМЕНДАЦИИ ПО ПОКРЫТИЮ:\n")
+                for recommendation in coverage.get('recommendations', []):
+                    write(f"- {recommendation}\n")
+                
+                write("\n")
             
-            report_lines.append("")
-        
-        # Сохранение текстового отчета
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(report_lines))
+            # Раздел анализа эффективности
+            if 'location_analysis' in analysis_results:
+                efficiency = analysis_results['location_analysis']
+                write("АНАЛИЗ ЭФФЕКТИВНОСТИ ЛОКАЦИЙ\n")
+                write("-" * 40 + "\n")
+                
+                # Топ-5 самых эффективных локаций
+                efficiency_scores = efficiency.get('efficiency_scores', [])
+                if efficiency_scores:
+                    # Частичная сортировка: нужны только пять лучших
+                    top_scores = nlargest(5, efficiency_scores, key=lambda x: x.get('efficiency_score', 0))
+                    write("Топ-5 самых эффективных локаций:\n")
+                    for i, item in enumerate(top_scores, 1):
+                        write(f"{i}. {item.get('name', '')} - {item.get('efficiency_score', 0):.2f}\n")
+                
+                write("\n")
+                write("РЕКОМЕНДАЦИИ ПО ЭФФЕКТИВНОСТИ:\n")
+                for recommendation in efficiency.get('recommendations', []):
+                    write(f"- {recommendation}\n")
+                
+                write("\n")
         
         logger.info(f"Текстовый отчет сохранен в {output_path}")
+        return True
     
-    def _generate_dashboard(self, analysis_results: Dict[str, Any], output_path: str) -> None:
-        """Генерация интерактивного дашборда."""
+    def _generate_dashboard(self, analysis_results: Dict[str, Any], output_path: str, now: datetime = None) -> bool:
+        """Генерация интерактивного дашборда. Возвращает False, если данных для отчета нет."""
+        # Дашборд пока содержит только раздел покрытия
+        if 'coverage_analysis' not in analysis_results:
+            return False
+        
         # Здесь можно реализовать генерацию дашборда с использованием библиотек
         # like Plotly Dash, Panel, или просто HTML с JavaScript
         # Пока создаем простой HTML-отчет
         
-        html_content = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Анализ дистрибуционной сети Т2</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                h1 { color: #333; }
-                .section { margin-bottom: 30px; }
-                .metric { background-color: #f5f5f5; padding: 10px; margin: 5px 0; }
-            </style>
-        </head>
-        <body>
-            <h1>Анализ дистрибуционной сети Т2</h1>
-            <p>Дата генерации: {date}</p>
-        """.format(date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        parts = [DASHBOARD_HEADER_TEMPLATE.substitute(date=(now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S'))]
         
-        # Добавление секций анализа
+        # Добавление секций анализа (фрагменты собираются в список и склеиваются один раз)
         if 'coverage_analysis' in analysis_results:
             coverage = analysis_results['coverage_analysis']
-            html_content += """
+            parts.append("""
             <div class="section">
                 <h2>Анализ покрытия</h2>
-            """
+            """)
             
             for metric, value in coverage.get('metrics', {}).items():
-                html_content += f'<div class="metric"><strong>{metric}:</strong> {value}</div>'
+                parts.append(
+                    f'<div class="metric"><strong>{html.escape(str(metric))}:</strong> {html.escape(str(value))}</div>'
+                )
             
-            html_content += "</div>"
+            parts.append("</div>")
         
-        html_content += """
+        parts.append("""
         </body>
         </html>
-        """
+        """)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(''.join(parts))
         
         logger.info(f"Дашборд сохранен в {output_path}")
+        return True
     
     def generate_executive_summary(self, analysis_results: Dict[str, Any]) -> str:
         """
@@ -203,33 +263,34 @@ class ReportGenerator:
         Returns:
             Краткое резюме в формате текста
         """
-        summary_lines = []
-        summary_lines.append("КРАТКОЕ РЕЗЮМЕ АНАЛИЗА ДИСТРИБУЦИОННОЙ СЕТИ Т2")
-        summary_lines.append("=" * 60)
+        # Текст собирается в bytearray из заранее закодированных строк
+        buf = bytearray(EXECUTIVE_SUMMARY_HEADER)
         
         # Ключевые метрики
         if 'coverage_analysis' in analysis_results:
             coverage = analysis_results['coverage_analysis']
             metrics = coverage.get('metrics', {})
             
-            summary_lines.append(f"Общее количество точек: {metrics.get('total_locations', 0)}")
-            summary_lines.append(f"Городов с покрытием: {metrics.get('cities_covered', 0)}")
-            summary_lines.append(f"Среднее количество точек на город: {metrics.get('avg_locations_per_city', 0):.2f}")
+            buf += (
+                f"Общее количество точек: {metrics.get('total_locations', 0)}\n"
+                f"Городов с покрытием: {metrics.get('cities_covered', 0)}\n"
+                f"Среднее количество точек на город: {metrics.get('avg_locations_per_city', 0):.2f}\n"
+            ).encode('utf-8')
         
         # Ключевые рекомендации
-        summary_lines.append("")
-        summary_lines.append("КЛЮЧЕВЫЕ РЕКОМЕНДАЦИИ:")
-        summary_lines.append("")
-        
-        # Сбор рекомендаций из всех анализов
-        all_recommendations = []
+        buf += EXECUTIVE_SUMMARY_RECOMMENDATIONS_HEADER
         
-        for analysis_name, analysis_data in analysis_results.items():
-            if 'recommendations' in analysis_data:
-                all_recommendations.extend(analysis_data['recommendations'])
+        # Рекомендации из всех анализов перебираются лениво, до первых пяти
+        all_recommendations = chain.from_iterable(
+            analysis_data['recommendations']
+            for analysis_data in analysis_results.values()
+            if 'recommendations' in analysis_data
+        )
         
         # Вывод топ-5 самых важных рекомендаций
-        for i, recommendation in enumerate(all_recommendations[:5], 1):
-            summary_lines.append(f"{i}. {recommendation}")
+        for i, recommendation in enumerate(islice(all_recommendations, 5), 1):
+            buf += f"{i}. {recommendation}\n".encode('utf-8')
         
-        return '\n'.join(summary_lines)
+        # Последний перевод строки не входит в резюме
+        del buf[-1]
+        return buf.decode('utf-8')
@@ -0,0 +1,41 @@
+"""
+Общая подготовка данных о салонах Т2 для аналитических модулей.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import NamedTuple
+from utils.constants import TELE2_NAME_REGEX
+from utils.geoutils import to_unit_vectors
+
+class Tele2Data(NamedTuple):
+    """Выборка салонов Т2, вычисляемая один раз на запуск конвейера."""
+    # Булева маска строк исходного DataFrame, относящихся к Т2
+    mask: np.ndarray
+    # Координаты (широта, долгота) салонов Т2 без пропусков, форма (n, 2)
+    coords: np.ndarray
+    # Единичные векторы тех же точек на сфере, форма (n, 3)
+    vectors: np.ndarray
+
+def prepare_tele2_data(df: pd.DataFrame) -> Tele2Data:
+    """
+    Фильтрация салонов Т2 и подготовка их координат.
+    
+    Результат передается в analyze_* методы анализаторов, чтобы не повторять
+    фильтрацию по названию и отбор координат в каждом из них.
+    
+    Args:
+        df: DataFrame с данными о салонах связи
+    
+    Returns:
+        Подготовленные данные о салонах Т2
+    """
+    mask = df['name'].str.contains(TELE2_NAME_REGEX, na=False).to_numpy()
+    
+    # Координаты отбираются индексированием массивов колонок, без копий DataFrame
+    lat = df['latitude'].to_numpy(dtype=float)
+    lon = df['longitude'].to_numpy(dtype=float)
+    valid = mask & np.isfinite(lat) & np.isfinite(lon)
+    coords = np.column_stack((lat[valid], lon[valid]))
+    
+    return Tele2Data(mask=mask, coords=coords, vectors=to_unit_vectors(coords[:, 0], coords[:, 1]).reshape(-1, 3))
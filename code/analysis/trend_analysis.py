@@ -5,6 +5,7 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from operator import itemgetter
 from typing import Dict, List, Any
 from utils.logger import get_logger
 
@@ -48,13 +49,22 @@ class TrendAnalyzer:
     def _add_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Добавление временных меток к данным."""
         df = df.copy()
+        # pd.Timestamp сохраняется колонкой datetime64, а не колонкой Python-объектов
+        now = pd.Timestamp.now()
         
         # Если в данных есть информация о дате открытия
         if 'established_year' in df.columns:
-            df['age_years'] = datetime.now().year - df['established_year']
+            # Возраст в годах помещается в int16
+            years = df['established_year']
+            if years.dtype.kind in 'iu':
+                df['age_years'] = np.int16(now.year) - years.to_numpy().astype(np.int16)
+            else:
+                # Пропуски года сохраняются в nullable-типе Int16 вместо перехода к float64
+                # (дробные значения года сначала округляются до целых)
+                df['age_years'] = np.int16(now.year) - pd.to_numeric(years).round().astype('Int16')
         
         # Добавление временной метки анализа
-        df['analysis_date'] = datetime.now()
+        df['analysis_date'] = now
         
         return df
     
@@ -64,13 +74,16 @@ class TrendAnalyzer:
         
         # Анализ по годам открытия (если данные доступны)
         if 'established_year' in df.columns:
-            yearly_trend = df.groupby('established_year').size()
-            time_analysis['yearly_trend'] = yearly_trend.to_dict()
+            # Отсортированные годы и количество открытий за один проход
+            years, counts = np.unique(df['established_year'].dropna().to_numpy(), return_counts=True)
+            time_analysis['yearly_trend'] = dict(zip(years.tolist(), counts.tolist()))
             
-            # Расчет роста/сокращения
-            if len(yearly_trend) > 1:
-                growth_rates = yearly_trend.pct_change() * 100
-                time_analysis['growth_rates'] = growth_rates.to_dict()
+            # Расчет роста/сокращения (для первого года рост не определен)
+            if len(counts) > 1:
+                growth_rates = np.empty(len(counts))
+                growth_rates[0] = np.nan
+                growth_rates[1:] = (counts[1:] / counts[:-1] - 1) * 100
+                time_analysis['growth_rates'] = dict(zip(years.tolist(), growth_rates.tolist()))
         
         return time_analysis
     
@@ -78,9 +91,10 @@ class TrendAnalyzer:
         """Анализ пространственных трендов."""
         spatial_analysis = {}
         
-        # Анализ распределения по городам
-        city_distribution = df['city'].value_counts()
-        spatial_analysis['city_distribution'] = city_distribution.to_dict()
+        # Анализ распределения по городам (по убыванию количества точек)
+        cities, counts = np.unique(df['city'].dropna().to_numpy(), return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        spatial_analysis['city_distribution'] = dict(zip(cities[order].tolist(), counts[order].tolist()))
         
         # Анализ плотности по регионам
         # (здесь можно добавить более сложный анализ по географическим регионам)
@@ -111,7 +125,8 @@ class TrendAnalyzer:
         
         # Рекомендации на основе временных трендов
         if 'growth_rates' in time_analysis:
-            recent_growth = list(time_analysis['growth_rates'].values())[-1] if time_analysis['growth_rates'] else 0
+            growth_rates = time_analysis['growth_rates']
+            recent_growth = next(reversed(growth_rates.values())) if growth_rates else 0
             
             if recent_growth < 0:
                 recommendations.append("Отрицательный рост сети. Необходима стратегия расширения")
@@ -121,7 +136,7 @@ class TrendAnalyzer:
         # Рекомендации на основе пространственного распределения
         city_distribution = spatial_analysis.get('city_distribution', {})
         if city_distribution:
-            top_cities = sorted(city_distribution.items(), key=lambda x: x[1], reverse=True)[:3]
+            top_cities = sorted(city_distribution.items(), key=itemgetter(1), reverse=True)[:3]
             recommendations.append(f"Основная концентрация точек в городах: {', '.join([city for city, _ in top_cities])}")
         
         return recommendations
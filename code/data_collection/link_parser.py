@@ -2,48 +2,103 @@
 Модуль для сбора ссылок на организации с Яндекс.Карт.
 """
 
+import os
 import time
 import json
+import queue
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from .webdriver_setup import WebDriverManager
+from utils.file_operations import append_ndjson
 
 class LinksCollector:
     def __init__(self, config):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.driver_manager = WebDriverManager(config)
+        # Дополнительные менеджеры драйверов для параллельного сбора
+        self._pool_managers = []
         
     def collect_links(self, city, org_type):
         """Сбор ссылок на организации заданного типа в указанном городе."""
         self.logger.info(f"Сбор ссылок для {org_type} в городе {city}")
         
         try:
-            # Инициализация драйвера
+            # Драйвер создается один раз и переиспользуется между запросами
             driver = self._init_driver()
+            return self._collect_with_driver(driver, city, org_type)
             
-            # Формирование запроса
-            query = f"{city} {self.config['ORG_TYPES'][org_type]}"
-            
-            # Выполнение поиска
-            links = self._perform_search(driver, query)
-            
-            # Сохранение результатов
-            self._save_links(links, city, org_type)
+        except Exception as e:
+            self.logger.error(f"Ошибка при сборе ссылок: {e}")
+            raise
+    
+    def collect_links_batch(self, cities, org_type):
+        """
+        Параллельный сбор ссылок для нескольких городов.
+        
+        Запросы распределяются по пулу из MAX_DRIVERS браузеров (по умолчанию 4):
+        каждый поток берет свободный драйвер из очереди и возвращает его после запроса.
+        
+        Args:
+            cities: Список городов
+            org_type: Тип организации
             
-            driver.quit()
-            return links
+        Returns:
+            Словарь {город: список ссылок}
+        """
+        if not cities:
+            return {}
+        
+        pool_size = min(self.config.get('MAX_DRIVERS', 4), len(cities))
+        self.logger.info(f"Сбор ссылок для {org_type} в {len(cities)} городах, браузеров: {pool_size}")
+        
+        # Менеджеры (и браузеры) сохраняются между вызовами, чтобы пул оставался прогретым
+        while len(self._pool_managers) < pool_size - 1:
+            self._pool_managers.append(WebDriverManager(self.config))
+        
+        drivers = queue.Queue()
+        for manager in [self.driver_manager] + self._pool_managers[:pool_size - 1]:
+            drivers.put(manager.get_driver())
+        
+        def collect(city):
+            driver = drivers.get()
+            try:
+                return self._collect_with_driver(driver, city, org_type)
+            finally:
+                drivers.put(driver)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                return dict(zip(cities, executor.map(collect, cities)))
             
         except Exception as e:
             self.logger.error(f"Ошибка при сборе ссылок: {e}")
             raise
     
+    def _collect_with_driver(self, driver, city, org_type):
+        """Поиск и сохранение ссылок для одного города с переданным драйвером."""
+        # Формирование запроса
+        query = f"{city} {self.config['ORG_TYPES'][org_type]}"
+        
+        # Выполнение поиска
+        links = self._perform_search(driver, query)
+        
+        # Сохранение результатов
+        self._save_links(links, city, org_type)
+        
+        # Сброс состояния браузера перед следующим запросом
+        driver.delete_all_cookies()
+        driver.get('about:blank')
+        return links
+    
     def _init_driver(self):
         """Инициализация WebDriver."""
-        # Реализация инициализации драйвера
-        pass
+        return self.driver_manager.get_driver()
     
     def _perform_search(self, driver, query):
         """Выполнение поиска и сбор ссылок."""
@@ -51,6 +106,12 @@ class LinksCollector:
         pass
     
     def _save_links(self, links, city, org_type):
-        """Сохранение собранных ссылок."""
-        # Реализация сохранения ссылок
-        pass
+        """
+        Сохранение собранных ссылок.
+        
+        Ссылки дописываются в data/raw/links/<тип>/<город>.ndjson (по одной на строку),
+        поэтому повторные сборы не перезаписывают уже сохраненные данные.
+        """
+        links_dir = os.path.join(self.config.get('LINKS_DIR', 'data/raw/links'), org_type)
+        os.makedirs(links_dir, exist_ok=True)
+        append_ndjson(links or [], os.path.join(links_dir, f"{city}.ndjson"))
@@ -2,23 +2,41 @@
 Модуль для управления WebDriver.
 """
 
+import atexit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 
 class WebDriverManager:
+    # Путь к ChromeDriver, найденный ChromeDriverManager (один поиск на процесс)
+    _chrome_driver_path = None
+    
     def __init__(self, config):
         self.config = config
+        self._driver = None
         
     def get_driver(self, browser_type="chrome"):
-        """Получение настроенного WebDriver."""
+        """Получение настроенного WebDriver (создается один раз и переиспользуется)."""
+        if self._driver is not None:
+            return self._driver
+        
         if browser_type.lower() == "chrome":
-            return self._get_chrome_driver()
+            self._driver = self._get_chrome_driver()
         elif browser_type.lower() == "firefox":
-            return self._get_firefox_driver()
+            self._driver = self._get_firefox_driver()
         else:
             raise ValueError(f"Unsupported browser type: {browser_type}")
+        
+        # Браузер закрывается при завершении процесса
+        atexit.register(self.close)
+        return self._driver
+    
+    def close(self):
+        """Закрытие WebDriver, если он был создан."""
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
     
     def _get_chrome_driver(self):
         """Настройка ChromeDriver."""
@@ -33,8 +51,11 @@ class WebDriverManager:
         if self.config.get('HEADLESS', False):
             chrome_options.add_argument("--headless")
             
+        if WebDriverManager._chrome_driver_path is None:
+            WebDriverManager._chrome_driver_path = ChromeDriverManager().install()
+        
         return webdriver.Chrome(
-            ChromeDriverManager().install(),
+            WebDriverManager._chrome_driver_path,
             options=chrome_options
         )
     
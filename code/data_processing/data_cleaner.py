@@ -5,35 +5,90 @@
 import pandas as pd
 import numpy as np
 
+# Колонки, по которым запись считается дубликатом
+DUPLICATE_KEY_COLUMNS = ['name', 'address']
+
+# Числовые колонки (приводятся к float, нечисловые значения становятся NaN)
+NUMERIC_COLUMNS = ['latitude', 'longitude', 'rating', 'reviews_count', 'established_year']
+
+# Текстовые колонки, в которых нормализуются пробелы
+TEXT_COLUMNS = ['name', 'address', 'city']
+
+# Колонки с небольшим числом повторяющихся значений (хранятся как category)
+CATEGORICAL_COLUMNS = ['city', 'region', 'org_type']
+
+# Допустимые диапазоны значений: выход за диапазон считается пропуском
+VALUE_RANGES = {
+    'latitude': (-90.0, 90.0),
+    'longitude': (-180.0, 180.0),
+    'rating': (0.0, 5.0)
+}
+
 class DataCleaner:
     def __init__(self, config):
         self.config = config
-        
+    
     def clean_data(self, df):
-        """Очистка данных."""
-        df = self._handle_missing_values(df)
-        df = self._remove_duplicates(df)
-        df = self._fix_data_types(df)
-        df = self._normalize_data(df)
+        """
+        Очистка данных.
         
-        return df
+        Каждая колонка обрабатывается за один проход (типы, пропуски, нормализация)
+        и записывается один раз; дубликаты удаляются одной операцией в конце.
+        """
+        cleaned = {}
+        for column in df.columns:
+            values = df[column].to_numpy()
+            values = self._fix_data_types(column, values)
+            values = self._handle_missing_values(column, values)
+            cleaned[column] = self._normalize_data(column, values)
+        
+        df = pd.DataFrame(cleaned, index=df.index)
+        return self._remove_duplicates(df)
     
-    def _handle_missing_values(self, df):
+    def _handle_missing_values(self, column, values):
         """Обработка пропущенных значений."""
-        # Реализация обработки пропусков
-        pass
+        # Отсутствие счетчика означает ноль; координаты и рейтинг остаются пропусками
+        if column.endswith('_count') and values.dtype.kind == 'f':
+            return np.nan_to_num(values, nan=0.0)
+        return values
     
     def _remove_duplicates(self, df):
         """Удаление дубликатов."""
-        # Реализация удаления дубликатов
-        pass
+        key_columns = [column for column in DUPLICATE_KEY_COLUMNS if column in df.columns]
+        if not key_columns:
+            return df.drop_duplicates()
+        return df.drop_duplicates(subset=key_columns)
     
-    def _fix_data_types(self, df):
+    def _fix_data_types(self, column, values):
         """Исправление типов данных."""
-        # Реализация исправления типов
-        pass
+        if column in NUMERIC_COLUMNS or column.endswith('_count'):
+            return pd.to_numeric(values, errors='coerce').astype(float)
+        
+        if column in CATEGORICAL_COLUMNS:
+            # Строки заменяются целочисленными кодами и небольшой таблицей категорий
+            return pd.Categorical(values)
+        
+        return values
     
-    def _normalize_data(self, df):
+    def _normalize_data(self, column, values):
         """Нормализация данных."""
-        # Реализация нормализации
-        pass
+        if column in VALUE_RANGES:
+            low, high = VALUE_RANGES[column]
+            return np.where((values >= low) & (values <= high), values, np.nan)
+        
+        if column in TEXT_COLUMNS and isinstance(values, pd.Categorical):
+            # Нормализуются только категории; совпавшие после нормализации объединяются
+            categories = self._normalize_text(values.categories.to_numpy())
+            category_codes, uniques = pd.factorize(categories)
+            codes = np.append(category_codes, -1)[values.codes]
+            return pd.Categorical.from_codes(codes, categories=uniques)
+        
+        if column in TEXT_COLUMNS and values.dtype == object:
+            return self._normalize_text(values)
+        
+        return values
+    
+    def _normalize_text(self, values):
+        """Схлопывание повторных пробелов; пустые строки становятся пропусками."""
+        text = pd.Series(values).str.split().str.join(' ')
+        return text.where(text != '').to_numpy()
@@ -4,7 +4,6 @@
 
 import pandas as pd
 import numpy as np
-from geopy.distance import geodesic
 
 class FeatureEngineer:
     def __init__(self, config):
@@ -34,5 +34,6 @@ def save_model(model, model_path, model_name):
     """Быстрое сохранение модели"""
     import joblib
     import os
+    from .model_trainer import MODEL_COMPRESSION
     os.makedirs(model_path, exist_ok=True)
-    joblib.dump(model, f"{model_path}/{model_name}.pkl")
+    joblib.dump(model, f"{model_path}/{model_name}.pkl", compress=MODEL_COMPRESSION, protocol=5)
@@ -2,19 +2,71 @@
 Модуль для обслуживания моделей (API и прогнозирование).
 """
 
+import os
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 import joblib
 import pandas as pd
 import numpy as np
 from flask import Flask, request, jsonify
+from utils.config_loader import load_config
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    # Без onnxruntime модели загружаются из pickle
+    ort = None
+
+# Максимальный размер пакета и время ожидания его заполнения (мс)
+MAX_BATCH_SIZE = 64
+MAX_BATCH_LATENCY_MS = 10
+
+# Количество десериализованных моделей, хранимых в кэше ModelServer
+MODEL_CACHE_SIZE = 8
+
+class OnnxModel:
+    """Модель, экспортированная в ONNX, с интерфейсом predict как у sklearn."""
+    
+    def __init__(self, file_path):
+        self.session = ort.InferenceSession(file_path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        
+    def predict(self, features):
+        """Прогноз: первый выход модели (метка кластера или значение регрессии)"""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        return self.session.run(None, {self.input_name: features})[0].ravel()
 
 class ModelServer:
     def __init__(self, config):
         self.config = config
         self.loaded_models = {}
+        # Кэш моделей по (абсолютный путь, время изменения файла)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         
     def load_model(self, model_path, model_name):
-        """Загрузка обученной модели"""
-        model = joblib.load(f"{model_path}/{model_name}.pkl")
+        """Загрузка обученной модели (ONNX при наличии, иначе pickle)"""
+        onnx_path = f"{model_path}/{model_name}.onnx"
+        use_onnx = ort is not None and os.path.exists(onnx_path)
+        full_path = onnx_path if use_onnx else f"{model_path}/{model_name}.pkl"
+        
+        # Повторная загрузка неизмененного файла не требует десериализации
+        key = (os.path.abspath(full_path), os.stat(full_path).st_mtime_ns)
+        with self._cache_lock:
+            model = self._cache.get(key)
+            if model is not None:
+                self._cache.move_to_end(key)
+        
+        if model is None:
+            model = OnnxModel(full_path) if use_onnx else joblib.load(full_path)
+            with self._cache_lock:
+                self._cache[key] = model
+                if len(self._cache) > MODEL_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        
         self.loaded_models[model_name] = model
         return model
         
@@ -29,6 +81,15 @@ class ModelServer:
         
     def recommend_locations(self, features):
         """Рекомендация локаций на основе кластеризации"""
+        centroids = self.loaded_models.get('location_recommender_centroids')
+        if centroids is not None:
+            # Ближайший центроид: |x|^2 - 2*x*c + |c|^2, произведение считается одним вызовом BLAS
+            features = np.ascontiguousarray(features, dtype=np.float32)
+            distances = (np.einsum('ij,ij->i', features, features)[:, None]
+                         - 2 * features @ centroids.T
+                         + np.einsum('ij,ij->i', centroids, centroids))
+            return distances.argmin(axis=1)
+        
         if 'location_recommender' not in self.loaded_models:
             raise ValueError("Модель рекомендации локаций не загружена")
             
@@ -36,13 +97,120 @@ class ModelServer:
         cluster = model.predict(features)
         return cluster
 
+class BatchPredictor:
+    """
+    Объединение одиночных запросов в пакеты для одного вызова predict.
+    
+    Запросы копятся в очереди; фоновый поток забирает до batch_size запросов
+    (или сколько пришло за max_latency_ms) и выполняет прогноз одним вызовом.
+    Некорректный запрос завершается ошибкой сам и не влияет на остальные запросы пакета.
+    """
+    
+    def __init__(self, predict_fn, batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_BATCH_LATENCY_MS,
+                 n_features=None):
+        self.predict_fn = predict_fn
+        # Ожидаемое число признаков (None - определяется по запросам пакета)
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        # Буфер пакета float32: строки запросов копируются в него без выделения памяти на каждый пакет
+        self._scratch = None
+        
+    def predict(self, features):
+        """Прогноз для одного вектора признаков (блокирует до готовности пакета)."""
+        # Проверка до постановки в очередь: нечисловые значения и неверная длина
+        # дают ошибку только этому запросу
+        row = np.asarray(features, dtype=np.float32).ravel()
+        if self.n_features is not None and len(row) != self.n_features:
+            raise ValueError(f"Ожидается {self.n_features} признаков, получено {len(row)}")
+        
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future.result()
+    
+    def _ensure_worker(self):
+        """Запуск фонового потока при первом запросе."""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+    
+    def _run(self):
+        """Цикл сборки пакетов и выполнения прогнозов."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_latency
+            
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            # Строки другой длины, чем у пакета, отклоняются по отдельности
+            batch = self._reject_mismatched(batch)
+            if not batch:
+                continue
+            
+            features, futures = zip(*batch)
+            try:
+                predictions = self.predict_fn(self._fill_scratch(features))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            
+            # Результаты раздаются по номеру строки в пакете
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+    
+    def _reject_mismatched(self, batch):
+        """Завершение ошибкой запросов, длина которых отличается от длины пакета."""
+        lengths = [len(row) for row, _ in batch]
+        width = self.n_features
+        if width is None:
+            # Длина большинства запросов пакета
+            width = max(set(lengths), key=lengths.count)
+        
+        accepted = []
+        for (row, future), length in zip(batch, lengths):
+            if length == width:
+                accepted.append((row, future))
+            else:
+                future.set_exception(ValueError(f"Ожидается {width} признаков, получено {length}"))
+        return accepted
+    
+    def _fill_scratch(self, features):
+        """Копирование векторов признаков в буфер пакета; возвращает срез по числу запросов."""
+        n_features = len(features[0])
+        if self._scratch is None or self._scratch.shape[1] != n_features:
+            self._scratch = np.empty((self.batch_size, n_features), dtype=np.float32)
+        
+        for i, row in enumerate(features):
+            self._scratch[i] = row
+        return self._scratch[:len(features)]
+
 # Пример Flask API для обслуживания моделей
 app = Flask(__name__)
-model_server = ModelServer()
+# Путь к файлу конфигурации задается переменной окружения T2_CONFIG
+model_server = ModelServer(load_config(os.environ['T2_CONFIG']) if os.environ.get('T2_CONFIG') else {})
+coverage_predictor = BatchPredictor(model_server.predict_coverage)
 
 @app.route('/predict/coverage', methods=['POST'])
 def predict_coverage():
     data = request.get_json()
-    features = np.array(data['features']).reshape(1, -1)
-    prediction = model_server.predict_coverage(features)
-    return jsonify({'prediction': prediction.tolist()})
+    features = np.asarray(data['features'], dtype=np.float32).ravel()
+    prediction = coverage_predictor.predict(features)
+    return jsonify({'prediction': np.atleast_1d(prediction).tolist()})
+
+if __name__ == '__main__':
+    # Параллельные запросы обрабатываются потоками и объединяются в пакеты
+    app.run(threaded=True)
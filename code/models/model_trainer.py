@@ -2,15 +2,21 @@
 Модуль для обучения моделей машинного обучения.
 """
 
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.cluster import KMeans, DBSCAN
-import xgboost as xgb
-import lightgbm as lgb
 import joblib
 from datetime import datetime
+from utils.logger import get_logger
+
+# Библиотеки моделей (lightgbm, sklearn, skl2onnx) импортируются в методах,
+# которые их используют: это сокращает время запуска процессов, не обучающих модели
+
+try:
+    import lz4
+    # Быстрое сжатие моделей; joblib определяет его при загрузке автоматически
+    MODEL_COMPRESSION = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESSION = ('zlib', 3)
+
+logger = get_logger(__name__)
 
 class ModelTrainer:
     def __init__(self, config):
@@ -24,19 +30,68 @@ class ModelTrainer:
         
     def train_coverage_model(self, X, y):
         """Обучение модели прогнозирования покрытия"""
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        import numpy as np
+        import lightgbm as lgb
+        
+        # Обучение на float32: ModelServer подает признаки в том же типе, без приведения при прогнозе
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        
+        # Градиентный бустинг на гистограммах: обучение и прогноз быстрее случайного леса
+        model = lgb.LGBMRegressor(
+            objective='regression',
+            n_estimators=500,
+            num_leaves=63,
+            max_depth=-1,
+            n_jobs=-1,
+            random_state=42
+        )
         model.fit(X, y)
         self.models['coverage_predictor'] = model
         return model
         
     def train_location_recommender(self, X):
         """Обучение модели рекомендации локаций"""
+        import numpy as np
+        from sklearn.cluster import KMeans
+        
         model = KMeans(n_clusters=5, random_state=42)
         model.fit(X)
         self.models['location_recommender'] = model
+        # Центроиды отдельно: ModelServer назначает кластер по ним без вызова sklearn
+        self.models['location_recommender_centroids'] = np.ascontiguousarray(model.cluster_centers_, dtype=np.float32)
         return model
         
     def save_models(self, path):
         """Сохранение обученных моделей"""
         for name, model in self.models.items():
-            joblib.dump(model, f"{path}/{name}.pkl")
+            joblib.dump(model, f"{path}/{name}.pkl", compress=MODEL_COMPRESSION, protocol=5)
+            
+            # Бустер LightGBM дополнительно сохраняется в его собственном текстовом формате
+            if hasattr(model, 'booster_'):
+                model.booster_.save_model(f"{path}/{name}.txt")
+            
+            # Копия в ONNX для быстрого инференса в ModelServer (только для моделей sklearn:
+            # для LGBMRegressor в skl2onnx нет зарегистрированного конвертера, он остается в pickle)
+            if type(model).__module__.startswith('sklearn.') and hasattr(model, 'n_features_in_'):
+                self._save_onnx(model, f"{path}/{name}.onnx")
+    
+    def _save_onnx(self, model, file_path):
+        """Экспорт модели в ONNX (входной тензор 'input' типа float32)"""
+        try:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            # Без skl2onnx модели сохраняются только в формате pickle
+            return
+        
+        try:
+            onnx_model = convert_sklearn(
+                model,
+                initial_types=[('input', FloatTensorType([None, model.n_features_in_]))]
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось экспортировать модель в ONNX ({file_path}): {e}")
+            return
+        
+        with open(file_path, 'wb') as f:
+            f.write(onnx_model.SerializeToString())
@@ -2,8 +2,25 @@ import subprocess
 import sys
 import time
 import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from config import CITIES
 
+# Блокировка вывода: строки разных городов не перемешиваются
+_print_lock = threading.Lock()
+
+def _read_lines(stream, city, lines=None):
+    """Построчное чтение вывода процесса: печать с префиксом города или накопление в lines"""
+    for line in stream:
+        if lines is not None:
+            lines.append(line)
+        else:
+            with _print_lock:
+                print(f"[{city}] {line.rstrip()}", flush=True)
+    stream.close()
+
 def run_analysis_for_city(city):
     """Запуск анализа для конкретного города"""
     print(f"Запуск анализа для города: {city}")
@@ -17,24 +34,30 @@ def run_analysis_for_city(city):
             cmd, 
             stdout=subprocess.PIPE, 
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            errors='replace'
         )
         
-        # Чтение вывода в реальном времени
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                print(output.strip())
+        # Чтение вывода в реальном времени: по потоку на каждый канал, чтобы процесс
+        # не блокировался на заполненном буфере stderr (stdout печатается сразу, stderr накапливается)
+        errors = []
+        readers = [
+            threading.Thread(target=_read_lines, args=(process.stdout, city), daemon=True),
+            threading.Thread(target=_read_lines, args=(process.stderr, city, errors), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
         
         # Проверка кода возврата
-        return_code = process.poll()
+        return_code = process.wait()
         if return_code != 0:
             print(f"Ошибка при обработке города {city}. Код возврата: {return_code}")
             # Вывод ошибок
-            for line in process.stderr:
-                print(f"ERROR: {line.strip()}")
+            with _print_lock:
+                for line in errors:
+                    print(f"[{city}] ERROR: {line.strip()}")
             
         return return_code == 0
         
@@ -57,26 +80,44 @@ def main():
         print("Ошибка: В config.py не определен список CITIES")
         return
     
-    successful_cities = []
-    failed_cities = []
+    # Города обрабатываются параллельно: анализ идет в дочерних процессах,
+    # число одновременных процессов ограничено ядрами и настройкой max_concurrent_requests
+    try:
+        from config import PERFORMANCE_SETTINGS
+        max_concurrent = PERFORMANCE_SETTINGS.get('max_concurrent_requests', 3)
+    except ImportError:
+        max_concurrent = 3
+    workers = max(1, min(len(CITIES), os.cpu_count() or 1, max_concurrent))
+    print(f"Одновременно обрабатывается городов: {workers}")
     
-    # Запуск для каждого города
-    for i, city in enumerate(CITIES, 1):
-        print(f"\n--- Обработка города {i}/{len(CITIES)}: {city} ---")
+    results = {}
+    pending_cities = iter(CITIES)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_analysis_for_city, city): city
+                   for city in islice(pending_cities, workers)}
         
-        success = run_analysis_for_city(city)
-        
-        if success:
-            successful_cities.append(city)
-            print(f"Город {city} успешно обработан")
-        else:
-            failed_cities.append(city)
-            print(f"Ошибка при обработке города {city}")
-        
-        # Пауза между городами для избежания блокировок
-        if i < len(CITIES):
-            print("Ожидание 15 секунд перед следующим городом...")
-            time.sleep(15)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                city = futures.pop(future)
+                results[city] = future.result()
+                
+                if results[city]:
+                    print(f"\n--- Город {city} успешно обработан ({len(results)}/{len(CITIES)}) ---")
+                else:
+                    print(f"\n--- Ошибка при обработке города {city} ({len(results)}/{len(CITIES)}) ---")
+            
+            # Пауза перед запуском следующих городов для избежания блокировок
+            # (после последнего города не нужна)
+            next_cities = list(islice(pending_cities, len(done)))
+            if next_cities:
+                time.sleep(random.uniform(10, 20))
+                for city in next_cities:
+                    futures[executor.submit(run_analysis_for_city, city)] = city
+    
+    # Итоги в порядке городов из config.py
+    successful_cities = [city for city in CITIES if results[city]]
+    failed_cities = [city for city in CITIES if not results[city]]
     
     # Вывод итогов
     print("\n" + "="*50)
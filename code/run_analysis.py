@@ -11,12 +11,6 @@ import os
 # Добавление src в путь для импорта
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from data_collection.link_parser import LinksCollector
-from data_collection.comprehensive_parser import ComprehensiveParser
-from data_processing.data_combiner import DataCombiner
-from analysis.coverage_analysis import CoverageAnalyzer
-from analysis.location_analysis import LocationAnalyzer
-from visualization.report_generator import ReportGenerator
 from utils.logger import setup_logger
 from utils.config_loader import load_config
 
@@ -33,6 +27,16 @@ def main():
     
     args = parser.parse_args()
     
+    # Тяжелые модули (selenium, pandas, sklearn) импортируются после разбора аргументов,
+    # чтобы --help и ошибки аргументов не ждали их загрузки
+    from data_collection.link_parser import LinksCollector
+    from data_collection.comprehensive_parser import ComprehensiveParser
+    from data_processing.data_combiner import DataCombiner
+    from analysis.coverage_analysis import CoverageAnalyzer
+    from analysis.location_analysis import LocationAnalyzer
+    from analysis.tele2_data import prepare_tele2_data
+    from visualization.report_generator import ReportGenerator
+    
     # Загрузка конфигурации
     config = load_config(args.config)
     
@@ -48,17 +52,19 @@ def main():
         if not args.skip_collection:
             logger.info("=== ЭТАП 1: СБОР ДАННЫХ ===")
             
+            # Один сборщик (и один браузер) на все типы организаций
+            collector = LinksCollector(config)
+            
             for org_type in args.types:
-                logger.info(f"Сбор ссылок для {org_type} в {args.city}")
+                logger.info("Сбор ссылок для %s в %s", org_type, args.city)
                 
                 # Сбор ссылок
-                collector = LinksCollector(config)
                 links = collector.collect_links(args.city, org_type)
                 
-                logger.info(f"Найдено {len(links)} ссылок для {org_type}")
+                logger.info("Найдено %d ссылок для %s", len(links), org_type)
                 
                 # Парсинг детальной информации
-                logger.info(f"Парсинг детальной информации для {org_type}")
+                logger.info("Парсинг детальной информации для %s", org_type)
                 parser = ComprehensiveParser(config)
                 parser.parse_data(org_type, links)
         
@@ -66,21 +72,24 @@ def main():
         logger.info("=== ЭТАП 2: ОБРАБОТКА ДАННЫХ ===")
         combiner = DataCombiner(config)
         combined_data = combiner.combine_datasets()
-        logger.info(f"Объединено данных: {len(combined_data)} записей")
+        logger.info("Объединено данных: %d записей", len(combined_data))
         
         # Этап 3: Анализ (если не пропущен)
         if not args.skip_analysis:
             logger.info("=== ЭТАП 3: АНАЛИЗ ===")
             
+            # Салоны Т2 выделяются один раз для всех анализаторов
+            tele2_data = prepare_tele2_data(combined_data)
+            
             # Анализ покрытия
             logger.info("Анализ покрытия дистрибуционной сети")
             coverage_analyzer = CoverageAnalyzer(config)
-            coverage_results = coverage_analyzer.analyze_coverage(combined_data)
+            coverage_results = coverage_analyzer.analyze_coverage(combined_data, tele2_data)
             
             # Анализ эффективности локаций
             logger.info("Анализ эффективности локаций")
             location_analyzer = LocationAnalyzer(config)
-            efficiency_results = location_analyzer.analyze_efficiency(combined_data)
+            efficiency_results = location_analyzer.analyze_efficiency(combined_data, tele2_data)
             
             # Этап 4: Генерация отчетов
             logger.info("=== ЭТАП 4: ГЕНЕРАЦИЯ ОТЧЕТОВ ===")
@@ -94,7 +103,7 @@ def main():
         logger.info("Анализ завершен успешно!")
         
     except Exception as e:
-        logger.error(f"Ошибка при выполнении анализа: {str(e)}")
+        logger.error("Ошибка при выполнении анализа: %s", e)
         import traceback
         logger.error(traceback.format_exc())
         sys.exit(1)
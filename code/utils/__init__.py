@@ -5,12 +5,12 @@
 from .soup_parser import ExtendedSoupContentParser
 from .logger import setup_logger, get_logger
 from .config_loader import load_config, save_config
-from .file_operations import read_json, write_json, read_csv, write_csv
-from .geoutils import calculate_distance, get_coordinates_from_address
+from .file_operations import read_json, write_json, append_ndjson, read_csv, write_csv
+from .geoutils import calculate_distance, haversine_km, get_coordinates_from_address
 from .data_validator import validate_data, clean_data
 from .date_utils import format_date, get_current_timestamp
 from .error_handler import retry_on_error, log_exceptions
-from .constants import SELECTORS, ORG_TYPES, CITY_CODES
+from .constants import SELECTORS, ORG_TYPES, ORG_TYPES_INV, CITY_CODES, CITY_CODES_INV
 
 __all__ = [
     'ExtendedSoupContentParser',
@@ -20,9 +20,11 @@ __all__ = [
     'save_config',
     'read_json',
     'write_json',
+    'append_ndjson',
     'read_csv',
     'write_csv',
     'calculate_distance',
+    'haversine_km',
     'get_coordinates_from_address',
     'validate_data',
     'clean_data',
@@ -32,5 +34,7 @@ __all__ = [
     'log_exceptions',
     'SELECTORS',
     'ORG_TYPES',
-    'CITY_CODES'
+    'ORG_TYPES_INV',
+    'CITY_CODES',
+    'CITY_CODES_INV'
 ]
@@ -2,14 +2,33 @@
 Модуль для загрузки и сохранения конфигурации.
 """
 
+import copy
+import functools
 import importlib.util
 import json
 import os
-from typing import Any, Dict
+import re
+import types
+from typing import Any, Dict, List
+from .logger import get_logger
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11: конфигурация в TOML недоступна, остается формат .py
+    tomllib = None
+
+logger = get_logger(__name__)
+
+# Ключи TOML, которые записываются без кавычек
+TOML_BARE_KEY_REGEX = re.compile(r'[A-Za-z0-9_-]+')
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """
-    Загрузка конфигурации из Python-файла.
+    Загрузка конфигурации из TOML- или Python-файла (по расширению).
+    
+    Конфигурация из Python-файла кэшируется в памяти по пути и времени изменения файла,
+    поэтому повторные загрузки в процессе не исполняют модуль заново.
     
     Args:
         config_path: Путь к файлу конфигурации
@@ -18,21 +37,54 @@ def load_config(config_path: str) -> Dict[str, Any]:
         Словарь с конфигурацией
     """
     try:
-        spec = importlib.util.spec_from_file_location("config", config_path)
-        config_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config_module)
+        if config_path.endswith('.toml'):
+            return load_config_toml(config_path)
         
-        # Преобразуем модуль в словарь
-        config_dict = {}
-        for key in dir(config_module):
-            if not key.startswith('_'):
-                config_dict[key] = getattr(config_module, key)
+        stat = os.stat(config_path)
+        config_dict = _load_config_cached(os.path.abspath(config_path), stat.st_mtime_ns)
         
-        return config_dict
+        # Копия, чтобы изменения конфигурации вызывающим кодом не попадали в кэш;
+        # импортированные в конфигурации модули не копируются
+        memo = {id(value): value for value in config_dict.values() if isinstance(value, types.ModuleType)}
+        return copy.deepcopy(config_dict, memo)
         
     except Exception as e:
         raise Exception(f"Ошибка при загрузке конфигурации: {str(e)}")
 
+def load_config_toml(config_path: str) -> Dict[str, Any]:
+    """
+    Загрузка конфигурации из TOML-файла.
+    
+    Args:
+        config_path: Путь к файлу конфигурации
+    
+    Returns:
+        Словарь с конфигурацией
+    """
+    if tomllib is None:
+        raise RuntimeError("Для загрузки конфигурации в формате TOML требуется Python 3.11+")
+    
+    with open(config_path, 'rb') as f:
+        return tomllib.load(f)
+
+@functools.lru_cache(maxsize=16)
+def _load_config_cached(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Исполнение Python-файла конфигурации (результат кэшируется по пути и времени изменения)."""
+    logger.warning(f"Конфигурация {config_path} исполняется как код Python; "
+                   f"рекомендуется перейти на TOML (migrate_config_py_to_toml)")
+    
+    spec = importlib.util.spec_from_file_location("config", config_path)
+    config_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config_module)
+    
+    # Преобразуем модуль в словарь
+    config_dict = {}
+    for key in dir(config_module):
+        if not key.startswith('_'):
+            config_dict[key] = getattr(config_module, key)
+    
+    return config_dict
+
 def save_config(config: Dict[str, Any], config_path: str) -> None:
     """
     Сохранение конфигурации в JSON-файл.
@@ -46,3 +98,58 @@ def save_config(config: Dict[str, Any], config_path: str) -> None:
             json.dump(config, f, ensure_ascii=False, indent=4)
     except Exception as e:
         raise Exception(f"Ошибка при сохранении конфигурации: {str(e)}")
+
+def migrate_config_py_to_toml(config_path: str, toml_path: str) -> None:
+    """
+    Однократный перевод конфигурации из Python-файла в TOML.
+    
+    Значения None в TOML не представимы и пропускаются, кортежи записываются как массивы.
+    
+    Args:
+        config_path: Путь к Python-файлу конфигурации
+        toml_path: Путь для сохранения TOML-файла
+    """
+    config = load_config(config_path)
+    
+    with open(toml_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(_toml_table_lines(config)) + '\n')
+
+def _toml_table_lines(table: Dict[str, Any], prefix: str = '') -> List[str]:
+    """Строки TOML для таблицы: сначала простые значения, затем вложенные таблицы."""
+    lines = []
+    subtables = []
+    for key, value in table.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            subtables.append((key, value))
+        else:
+            lines.append(f"{_toml_key(key)} = {_toml_value(value)}")
+    
+    for key, value in subtables:
+        name = f"{prefix}.{_toml_key(key)}" if prefix else _toml_key(key)
+        lines.extend(['', f"[{name}]"])
+        lines.extend(_toml_table_lines(value, name))
+    
+    return lines
+
+def _toml_key(key: Any) -> str:
+    """Ключ TOML (в кавычках, если содержит символы вне [A-Za-z0-9_-])."""
+    key = str(key)
+    return key if TOML_BARE_KEY_REGEX.fullmatch(key) else json.dumps(key, ensure_ascii=False)
+
+def _toml_value(value: Any) -> str:
+    """Значение TOML для строки, числа, логического значения, списка или словаря."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        # Экранирование строк JSON совместимо с базовыми строками TOML
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_toml_value(item) for item in value if item is not None) + ']'
+    if isinstance(value, dict):
+        items = (f"{_toml_key(key)} = {_toml_value(item)}" for key, item in value.items() if item is not None)
+        return '{' + ', '.join(items) + '}'
+    raise TypeError(f"Значение типа {type(value).__name__} не представимо в TOML")
@@ -2,6 +2,11 @@
 Константы проекта.
 """
 
+import re
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
 # Селекторы для парсинга Яндекс.Карт
 SELECTORS = {
     "name": "h1.orgpage-header-view__header",
@@ -14,11 +19,12 @@ SELECTORS = {
     "social_links": "a.button._view_secondary-gray._ui._size_medium._link",
     "categories": "span.breadcrumbs__item",
     "features": "div.business-features-view__feature",
-    "description": "div.business-description-view__text"
+    "description": "div.business-description-view__text",
+    "map_image": "meta[property='og:image']"
 }
 
 # Типы организаций
-ORG_TYPES = {
+ORG_TYPES = MappingProxyType({
     "tele2": "салон связи Tele2",
     "mts": "салон связи МТС",
     "beeline": "салон связи Билайн",
@@ -27,10 +33,77 @@ ORG_TYPES = {
     "shopping_center": "торговый центр",
     "bank": "банк",
     "atm": "банкомат"
-}
+})
+
+# Обратный справочник: поисковый запрос -> тип организации
+ORG_TYPES_INV = MappingProxyType({query: org_type for org_type, query in ORG_TYPES.items()})
+
+# Шаблоны названий операторов (в порядке приоритета)
+OPERATOR_PATTERNS = [
+    ('Tele2', r'tele2|т2'),
+    ('МТС', r'мтс|mts'),
+    ('Билайн', r'билайн|beeline'),
+    ('МегаФон', r'мегафон|megafon')
+]
+
+# Определение оператора одним вызовом match: группа с именем оператора в опережающей проверке
+# на каждую ветку; ветки перебираются по порядку, поэтому приоритет OPERATOR_PATTERNS сохраняется
+OPERATOR_REGEX = re.compile(
+    '|'.join(f'(?=.*?(?P<{operator}>{pattern}))' for operator, pattern in OPERATOR_PATTERNS),
+    re.IGNORECASE | re.DOTALL
+)
+
+# Метка салонов, название которых не соответствует ни одному оператору
+OTHER_OPERATOR = 'Другой'
+
+def identify_operators(names: pd.Series) -> pd.Categorical:
+    """
+    Векторная идентификация операторов по названиям (в порядке приоритета OPERATOR_PATTERNS).
+    
+    Args:
+        names: Названия салонов
+    
+    Returns:
+        Категории операторов (OTHER_OPERATOR для остальных салонов)
+    """
+    # Названия сетевых салонов повторяются: классифицируются только уникальные значения,
+    # приведенные к нижнему регистру один раз для всех операторов
+    codes, unique_names = pd.factorize(names.astype(str), use_na_sentinel=False)
+    names_lower = pd.Series(unique_names).str.lower()
+    masks = [names_lower.str.contains(pattern, regex=True, na=False) for _, pattern in OPERATOR_PATTERNS]
+    
+    operators = [operator for operator, _ in OPERATOR_PATTERNS]
+    unique_codes = np.select(masks, np.arange(len(operators)), default=len(operators))
+    
+    # Категориальный тип: сравнения и groupby работают по целочисленным кодам
+    return pd.Categorical.from_codes(unique_codes[codes], categories=operators + [OTHER_OPERATOR])
+
+def identify_operator(name: str) -> str:
+    """
+    Идентификация оператора по одному названию.
+    
+    Args:
+        name: Название салона связи
+    
+    Returns:
+        Идентифицированный оператор
+    """
+    match = OPERATOR_REGEX.match(str(name))
+    return match.lastgroup if match else OTHER_OPERATOR
+
+# Скомпилированные шаблоны названий по операторам (для фильтрации салонов одного оператора)
+OPERATOR_NAME_REGEXES = MappingProxyType({
+    operator: re.compile(pattern, re.IGNORECASE) for operator, pattern in OPERATOR_PATTERNS
+})
+
+# Скомпилированный шаблон для фильтрации салонов Т2 по названию
+TELE2_NAME_REGEX = OPERATOR_NAME_REGEXES['Tele2']
+
+# Все нецифровые символы (телефонные номера, счетчики отзывов)
+NON_DIGIT_REGEX = re.compile(r'\D+')
 
 # Коды городов
-CITY_CODES = {
+CITY_CODES = MappingProxyType({
     "Москва": "msk",
     "Санкт-Петербург": "spb",
     "Новосибирск": "nsk",
@@ -41,7 +114,10 @@ CITY_CODES = {
     "Самара": "sam",
     "Омск": "oms",
     "Ростов-на-Дону": "rnd"
-}
+})
+
+# Обратный справочник: код города -> город
+CITY_CODES_INV = MappingProxyType({code: city for city, code in CITY_CODES.items()})
 
 # Стандартные настройки
 DEFAULT_CONFIG = {
@@ -5,6 +5,7 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List
+from .constants import NON_DIGIT_REGEX
 
 def validate_data(data: Dict[str, Any], required_fields: List[str]) -> bool:
     """
@@ -47,6 +48,26 @@ def clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return cleaned_data
 
+def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Векторизованная очистка текстовых колонок DataFrame (как для строк в clean_data).
+    
+    Колонки изменяются на месте; нестроковые значения в колонках типа object сохраняются.
+    
+    Args:
+        df: DataFrame для очистки
+    
+    Returns:
+        Тот же DataFrame с очищенными строками
+    """
+    for column in df.select_dtypes(include=['object', 'string']).columns:
+        values = df[column]
+        # Удаляем лишние пробелы и переносы строк
+        cleaned = values.str.split().str.join(' ')
+        df[column] = cleaned.where(cleaned.notna(), values)
+    
+    return df
+
 def normalize_phone(phone: str) -> str:
     """
     Нормализация телефонного номера.
@@ -58,7 +79,7 @@ def normalize_phone(phone: str) -> str:
         Нормализованный телефонный номер
     """
     # Удаляем все нецифровые символы
-    digits = ''.join(filter(str.isdigit, phone))
+    digits = NON_DIGIT_REGEX.sub('', phone)
     
     # Приводим к формату +7XXXXXXXXXX
     if digits.startswith('8') and len(digits) == 11:
@@ -69,3 +90,24 @@ def normalize_phone(phone: str) -> str:
         return '+7' + digits
     
     return phone
+
+def normalize_phone_series(phones: pd.Series) -> pd.Series:
+    """
+    Векторизованная нормализация телефонных номеров (правила как в normalize_phone).
+    
+    Args:
+        phones: Серия телефонных номеров
+    
+    Returns:
+        Серия нормализованных номеров; номера нераспознанного формата не изменяются
+    """
+    digits = phones.str.replace(NON_DIGIT_REGEX, '', regex=True)
+    length = digits.str.len()
+    first_digit = digits.str[0]
+    
+    normalized = np.select(
+        [(first_digit == '8') & (length == 11), (first_digit == '7') & (length == 11), length == 10],
+        ['+7' + digits.str[1:], '+' + digits, '+7' + digits],
+        default=phones
+    )
+    return pd.Series(normalized, index=phones.index, name=phones.name)
@@ -2,7 +2,8 @@
 Утилиты для работы с датами и временем.
 """
 
-from datetime import datetime, timedelta
+import pandas as pd
+from datetime import datetime
 from typing import List  # Добавьте этот импорт
 
 def format_date(date_obj: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
@@ -51,11 +52,17 @@ def get_date_range(start_date: datetime, end_date: datetime) -> List[datetime]:
     Returns:
         Список дат в диапазоне
     """
-    dates = []
-    current_date = start_date
+    return get_date_range_np(start_date, end_date).to_pydatetime().tolist()
+
+def get_date_range_np(start_date: datetime, end_date: datetime) -> pd.DatetimeIndex:
+    """
+    Получение дат в диапазоне в виде DatetimeIndex (для векторизованных операций).
     
-    while current_date <= end_date:
-        dates.append(current_date)
-        current_date += timedelta(days=1)
+    Args:
+        start_date: Начальная дата
+        end_date: Конечная дата
     
-    return dates
+    Returns:
+        DatetimeIndex с шагом в один день
+    """
+    return pd.date_range(start_date, end_date, freq='D')
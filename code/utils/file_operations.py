@@ -4,26 +4,105 @@
 
 import json
 import csv
+import math
+import numpy as np
 import pandas as pd
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
+
+try:
+    import orjson
+except ImportError:
+    # Без orjson используется стандартный модуль json
+    orjson = None
+
+try:
+    import pyarrow.csv as pacsv
+except ImportError:
+    # Без pyarrow большие CSV читаются через pandas
+    pacsv = None
 
 def read_json(file_path: str) -> Any:
-    """Чтение JSON-файла."""
+    """Чтение JSON-файла (через orjson, если он установлен)."""
+    if orjson is not None:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Файлы со значениями NaN/Infinity (запись стандартным json) orjson не принимает
+            return json.loads(data)
+    
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def write_json(data: Any, file_path: str, indent: int = 4) -> None:
-    """Запись данных в JSON-файл."""
+    """
+    Запись данных в JSON-файл.
+    
+    При наличии orjson и отступе 2 пробела сериализация выполняется им (поддерживает
+    типы NumPy и нестроковые ключи). Другие отступы orjson не поддерживает, а NaN/Infinity
+    записывает как null, поэтому в этих случаях используется стандартный модуль json.
+    """
+    if orjson is not None and indent == 2 and not _has_non_finite(data):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+        return
+    
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=indent)
 
+def _has_non_finite(data: Any) -> bool:
+    """Проверка наличия значений NaN/Infinity в данных для записи в JSON."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(item) for item in data)
+    if isinstance(data, np.ndarray) and data.dtype.kind in 'fc':
+        return not np.isfinite(data).all()
+    return False
+
+def append_ndjson(records: List[Any], file_path: str) -> None:
+    """
+    Дозапись записей в файл NDJSON (одна JSON-запись на строку).
+    
+    Файл не перезаписывается целиком: добавляются только новые записи.
+    """
+    if orjson is not None:
+        dumps = orjson.dumps
+    else:
+        dumps = lambda record: json.dumps(record, ensure_ascii=False).encode('utf-8')
+    
+    with open(file_path, 'ab', buffering=1 << 20) as f:
+        f.writelines(dumps(record) + b'\n' for record in records)
+
 def read_csv(file_path: str) -> List[Dict[str, Any]]:
     """Чтение CSV-файла."""
     with open(file_path, 'r', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
-def write_csv(data: List[Dict[str, Any]], file_path: str) -> None:
-    """Запись данных в CSV-файл."""
+def read_csv_fast(file_path: str) -> pd.DataFrame:
+    """
+    Чтение большого CSV-файла в DataFrame.
+    
+    При наличии pyarrow файл разбирается многопоточным колоночным парсером,
+    иначе используется pandas.
+    """
+    if pacsv is not None:
+        table = pacsv.read_csv(file_path, read_options=pacsv.ReadOptions(use_threads=True))
+        return table.to_pandas()
+    return pd.read_csv(file_path)
+
+def write_csv(data: Union[List[Dict[str, Any]], pd.DataFrame], file_path: str) -> None:
+    """Запись данных (списка словарей или DataFrame) в CSV-файл."""
+    if isinstance(data, pd.DataFrame):
+        # DataFrame пишется напрямую, без преобразования в список словарей
+        if not data.empty:
+            data.to_csv(file_path, index=False)
+        return
+    
     if not data:
         return
         
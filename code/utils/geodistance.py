@@ -0,0 +1,133 @@
+"""
+JIT-компилируемые (numba) ядра для расчета расстояний.
+"""
+
+import numpy as np
+from .geoutils import EARTH_RADIUS_KM, haversine_km
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Без numba ядра работают как обычные функции Python
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@njit(parallel=True, fastmath=True, cache=True)
+def pairwise_haversine_upper(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Попарные расстояния (км) между точками по формуле гаверсинусов.
+    
+    Args:
+        lat: Массив широт в градусах
+        lon: Массив долгот в градусах
+    
+    Returns:
+        Расстояния для пар i < j в порядке np.triu_indices(n, 1)
+    """
+    n = lat.shape[0]
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    cos_lat = np.cos(lat_rad)
+    distances = np.empty(n * (n - 1) // 2)
+    
+    for i in prange(n):
+        offset = i * (2 * n - i - 1) // 2
+        for j in range(i + 1, n):
+            sin_dlat = np.sin((lat_rad[j] - lat_rad[i]) / 2)
+            sin_dlon = np.sin((lon_rad[j] - lon_rad[i]) / 2)
+            a = sin_dlat * sin_dlat + cos_lat[i] * cos_lat[j] * sin_dlon * sin_dlon
+            distances[offset + j - i - 1] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(min(a, 1.0)))
+    
+    return distances
+
+@njit(parallel=True, fastmath=True, cache=True)
+def has_neighbor_within(lat: np.ndarray, lon: np.ndarray, ref_lat: np.ndarray, ref_lon: np.ndarray,
+                        radius_km: float) -> np.ndarray:
+    """
+    Проверка наличия хотя бы одной опорной точки в пределах радиуса от каждой точки.
+    
+    Расчеты ведутся в float32; перебор опорных точек прерывается на первом совпадении,
+    промежуточные матрицы расстояний не создаются.
+    
+    Args:
+        lat: Массив широт проверяемых точек в градусах
+        lon: Массив долгот проверяемых точек в градусах
+        ref_lat: Массив широт опорных точек в градусах
+        ref_lon: Массив долгот опорных точек в градусах
+        radius_km: Радиус в километрах
+    
+    Returns:
+        Булев массив длины len(lat)
+    """
+    n = lat.shape[0]
+    m = ref_lat.shape[0]
+    lat_rad = np.radians(lat).astype(np.float32)
+    lon_rad = np.radians(lon).astype(np.float32)
+    ref_lat_rad = np.radians(ref_lat).astype(np.float32)
+    ref_lon_rad = np.radians(ref_lon).astype(np.float32)
+    ref_cos_lat = np.cos(ref_lat_rad)
+    # Сравнение идет с порогом для величины a из формулы гаверсинусов,
+    # поэтому arcsin и sqrt на каждую пару не нужны
+    threshold = np.float32(np.sin(min(radius_km / (2 * EARTH_RADIUS_KM), np.pi / 2)) ** 2)
+    half = np.float32(0.5)
+    result = np.zeros(n, dtype=np.bool_)
+    
+    for i in prange(n):
+        cos_lat = np.cos(lat_rad[i])
+        for j in range(m):
+            sin_dlat = np.sin((ref_lat_rad[j] - lat_rad[i]) * half)
+            sin_dlon = np.sin((ref_lon_rad[j] - lon_rad[i]) * half)
+            if sin_dlat * sin_dlat + cos_lat * ref_cos_lat[j] * sin_dlon * sin_dlon <= threshold:
+                result[i] = True
+                break
+    
+    return result
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _haversine_kernel(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray,
+                      out: np.ndarray) -> np.ndarray:
+    """Поэлементные расстояния (км) без промежуточных массивов sin/cos; результат пишется в out."""
+    to_rad = np.pi / 180.0
+    for i in prange(lat1.shape[0]):
+        lat1_rad = lat1[i] * to_rad
+        lat2_rad = lat2[i] * to_rad
+        sin_dlat = np.sin((lat2_rad - lat1_rad) / 2)
+        sin_dlon = np.sin((lon2[i] - lon1[i]) * to_rad / 2)
+        a = sin_dlat * sin_dlat + np.cos(lat1_rad) * np.cos(lat2_rad) * sin_dlon * sin_dlon
+        out[i] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(min(a, 1.0)))
+    
+    return out
+
+def haversine_km_batch(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray,
+                       out: np.ndarray = None) -> np.ndarray:
+    """
+    Поэлементные расстояния (км) между парами точек для одномерных массивов одной длины.
+    
+    Args:
+        lat1: Массив широт первых точек в градусах
+        lon1: Массив долгот первых точек в градусах
+        lat2: Массив широт вторых точек в градусах
+        lon2: Массив долгот вторых точек в градусах
+        out: Заранее выделенный массив float64 для результата (опционально)
+    
+    Returns:
+        Массив расстояний (out, если он передан)
+    """
+    if not NUMBA_AVAILABLE:
+        # Без numba цикл на Python медленнее векторизованного NumPy
+        distances = haversine_km(lat1, lon1, lat2, lon2)
+        if out is None:
+            return distances
+        out[:] = distances
+        return out
+    
+    lat1, lon1, lat2, lon2 = (np.ascontiguousarray(value, dtype=np.float64) for value in (lat1, lon1, lat2, lon2))
+    if out is None:
+        out = np.empty(lat1.shape[0])
+    return _haversine_kernel(lat1, lon1, lat2, lon2, out)
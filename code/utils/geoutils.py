@@ -2,8 +2,11 @@
 Географические утилиты.
 """
 
-from geopy.distance import geodesic
-from typing import Tuple, Optional
+import numpy as np
+from typing import Tuple, Optional, Union
+
+# Средний радиус Земли (IUGG), км
+EARTH_RADIUS_KM = 6371.0088
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -18,7 +21,70 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Returns:
         Расстояние в километрах
     """
-    return geodesic((lat1, lon1), (lat2, lon2)).km
+    # Сферическое приближение (погрешность порядка 0.5%) вместо итеративного решения на эллипсоиде;
+    # для массивов точек используйте haversine_km
+    return float(haversine_km(lat1, lon1, lat2, lon2))
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Векторизованный расчет расстояния по формуле гаверсинусов в километрах.
+    
+    Принимает скаляры или массивы NumPy (с поддержкой broadcasting).
+    
+    Args:
+        lat1: Широта первой точки (точек)
+        lon1: Долгота первой точки (точек)
+        lat2: Широта второй точки (точек)
+        lon2: Долгота второй точки (точек)
+    
+    Returns:
+        Расстояние (массив расстояний) в километрах
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Перевод координат в единичные векторы на сфере (x, y, z).
+    
+    Args:
+        lat: Массив широт в градусах
+        lon: Массив долгот в градусах
+    
+    Returns:
+        Массив формы (n, 3)
+    """
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    lon_rad = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat_rad)
+    
+    return np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """
+    Перевод длины хорды единичной сферы в расстояние по дуге в километрах.
+    
+    Args:
+        chord: Длина хорды (скаляр или массив)
+    
+    Returns:
+        Расстояние в километрах
+    """
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0.0, 1.0))
+
+def km_to_chord(distance_km: float) -> float:
+    """
+    Перевод расстояния по дуге в километрах в длину хорды единичной сферы.
+    
+    Args:
+        distance_km: Расстояние в километрах
+    
+    Returns:
+        Длина хорды
+    """
+    return 2 * np.sin(np.minimum(distance_km / (2 * EARTH_RADIUS_KM), np.pi / 2))
 
 def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
@@ -34,19 +100,20 @@ def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     # Пока возвращаем заглушку
     return None
 
-def is_point_in_radius(lat1: float, lon1: float, lat2: float, lon2: float, radius_km: float) -> bool:
+def is_point_in_radius(lat1, lon1, lat2, lon2, radius_km: float) -> Union[bool, np.ndarray]:
     """
-    Проверка, находится ли точка в пределах заданного радиуса.
+    Проверка, находится ли точка (точки) в пределах заданного радиуса.
     
     Args:
-        lat1: Широта центральной точки
-        lon1: Долгота центральной точки
-        lat2: Широта проверяемой точки
-        lon2: Долгота проверяемой точки
+        lat1: Широта центральной точки (точек)
+        lon1: Долгота центральной точки (точек)
+        lat2: Широта проверяемой точки (точек)
+        lon2: Долгота проверяемой точки (точек)
         radius_km: Радиус в километрах
     
     Returns:
-        True, если точка находится в радиусе, иначе False
+        True, если точка находится в радиусе, иначе False; для массивов - булев массив
     """
-    distance = calculate_distance(lat1, lon1, lat2, lon2)
-    return distance <= radius_km
+    # Для порогов в километры сферического приближения достаточно, геодезическая точность не нужна
+    inside = haversine_km(lat1, lon1, lat2, lon2) <= radius_km
+    return bool(inside) if inside.ndim == 0 else inside
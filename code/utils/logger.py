@@ -7,6 +7,9 @@ import os
 from datetime import datetime
 from typing import Optional
 
+# Общий форматтер для всех обработчиков
+LOG_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
 def setup_logger(name: str = __name__, 
                 log_level: int = logging.INFO,
                 log_file: Optional[str] = None) -> logging.Logger:
@@ -24,12 +27,13 @@ def setup_logger(name: str = __name__,
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
     
-    # Форматтер
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Повторная настройка не добавляет обработчики: иначе каждое сообщение выводилось бы несколько раз
+    if logger.handlers:
+        return logger
     
     # Обработчик для консоли
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(LOG_FORMATTER)
     logger.addHandler(console_handler)
     
     # Обработчик для файла (если указан)
@@ -38,7 +42,7 @@ def setup_logger(name: str = __name__,
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
         
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(LOG_FORMATTER)
         logger.addHandler(file_handler)
     
     return logger
@@ -2,48 +2,170 @@
 Модуль для парсинга данных с помощью BeautifulSoup.
 """
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 import re
-from typing import Dict, List, Any, Optional 
+from collections import defaultdict
+from typing import BinaryIO, Dict, List, Any, Optional, Tuple
+from lxml import etree
 from .logger import get_logger
+from .constants import SELECTORS, NON_DIGIT_REGEX
+
+try:
+    import ahocorasick
+except ImportError:
+    # Без pyahocorasick ключевые слова ищутся поочередно проверкой подстрок
+    ahocorasick = None
 
 logger = get_logger(__name__)
 
+# Парсер, с которым должен строиться BeautifulSoup (в разы быстрее встроенного html.parser)
+SOUP_FEATURES = "lxml"
+
+# Координаты (долгота, широта) в URL изображения карты
+COORDINATES_REGEX = re.compile(r'll=([\d\.]+)%2C([\d\.]+)')
+
+# Классы элементов, которые читают методы парсера
+ORG_PAGE_CLASS_REGEX = re.compile(
+    r'orgpage-header-view|business-contacts-view|card-phones-view|business-urls-view|'
+    r'business-summary-rating-badge-view|business-reviews-view|breadcrumbs__item|'
+    r'business-features-view|business-description-view|_view_secondary-gray'
+)
+
+class OrgPageStrainer(SoupStrainer):
+    """
+    Фильтр построения дерева: сохраняются только элементы, которые читают методы
+    парсера (вместе с их содержимым), и мета-теги времени работы и изображения карты.
+    
+    Поддерживает оба интерфейса SoupStrainer: search_tag (bs4 < 4.13)
+    и allow_tag_creation (bs4 >= 4.13).
+    """
+    
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, str):
+            return self._is_target(markup_name, markup_attrs)
+        return super().search_tag(markup_name, markup_attrs)
+    
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self._is_target(name, attrs or {})
+    
+    @staticmethod
+    def _is_target(name, attrs) -> bool:
+        if name == 'meta':
+            return attrs.get('itemprop') == 'openingHours' or attrs.get('property') == 'og:image'
+        
+        class_value = attrs.get('class')
+        if isinstance(class_value, (list, tuple)):
+            class_value = ' '.join(class_value)
+        return bool(class_value) and ORG_PAGE_CLASS_REGEX.search(class_value) is not None
+
+# Общий экземпляр фильтра для from_html
+ORG_PAGE_STRAINER = OrgPageStrainer()
+
+# Элементы основной информации (тег, класс), собираемые за один обход дерева
+BASIC_INFO_TARGETS = frozenset({
+    ("h1", "orgpage-header-view__header"),
+    ("a", "business-contacts-view__address-link"),
+    ("div", "card-phones-view__number"),
+    ("span", "business-urls-view__text"),
+    ("span", "business-summary-rating-badge-view__rating-text"),
+    ("span", "business-reviews-view__review-count"),
+    ("a", "_view_secondary-gray")
+})
+
+# Ключ ссылок соцсетей в BASIC_INFO_TARGETS
+SOCIAL_LINK_KEY = ("a", "_view_secondary-gray")
+
+# Полный набор классов ссылок соцсетей (другие кнопки с классом _view_secondary-gray,
+# например "Маршрут" и "Позвонить", имеют другой набор классов)
+SOCIAL_LINK_CLASSES = frozenset({"button", "_view_secondary-gray", "_ui", "_size_medium", "_link"})
+
 class ExtendedSoupContentParser:
     def __init__(self):
         self.rating_map = {
             'плохо': 1, 'удовлетворительно': 2, 'хорошо': 3, 
             'отлично': 4, 'восхитительно': 5
         }
-        self.modern_keywords = ['новый', 'modern', 'стиль', 'премиум', 'люкс', 'стекло', 'светодиодный']
+        self.modern_keywords = ('новый', 'modern', 'стиль', 'премиум', 'люкс', 'стекло', 'светодиодный')
+        self._keyword_automaton = self._build_keyword_automaton(self.modern_keywords)
+    
+    @staticmethod
+    def _build_keyword_automaton(keywords: Tuple[str, ...]):
+        """Автомат Ахо-Корасик для поиска всех ключевых слов за один проход по тексту."""
+        if ahocorasick is None:
+            return None
         
-    def parse_basic_info(self, soup: BeautifulSoup) -> Dict[str, Any]:
-        """Парсинг основной информации об организации."""
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+    
+    @staticmethod
+    def from_html(html: bytes) -> BeautifulSoup:
+        """
+        Построение дерева страницы для методов парсера.
+        
+        В дерево попадают только нужные парсеру элементы (см. OrgPageStrainer),
+        что сокращает время разбора и память на больших страницах.
+        
+        Args:
+            html: Исходный код страницы в байтах (lxml разбирает байты быстрее, чем декодированную строку)
+        
+        Returns:
+            Объект BeautifulSoup, построенный парсером lxml
+        """
+        return BeautifulSoup(html, SOUP_FEATURES, parse_only=ORG_PAGE_STRAINER)
+        
+    def parse_basic_info(self, soup: BeautifulSoup, raw: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Парсинг основной информации об организации (soup строится через from_html).
+        
+        Args:
+            soup: Дерево страницы
+            raw: Исходный код страницы (опционально): разделы, классов которых в нем нет,
+                не ищутся, а при отсутствии всех разделов дерево не обходится
+        
+        Returns:
+            Словарь с основной информацией об организации
+        """
         result = {}
         
         try:
+            # Все нужные элементы собираются за один обход дерева
+            if raw is None:
+                targets, with_hours = BASIC_INFO_TARGETS, True
+            else:
+                # Поиск подстроки в байтах намного дешевле обхода дерева
+                targets = frozenset(key for key in BASIC_INFO_TARGETS if key[1].encode() in raw)
+                with_hours = b'openingHours' in raw
+            
+            if targets or with_hours:
+                elements = self._index_elements(soup, targets, with_hours)
+            else:
+                elements = defaultdict(list)
+            
             # Название организации
-            name_elem = soup.find("h1", {"class": "orgpage-header-view__header"})
+            name_elem = self._first(elements, "h1", "orgpage-header-view__header")
             result['name'] = name_elem.getText().strip() if name_elem else ""
             
             # Адрес
-            address_elem = soup.find("a", {"class": "business-contacts-view__address-link"})
+            address_elem = self._first(elements, "a", "business-contacts-view__address-link")
             result['address'] = address_elem.getText().strip() if address_elem else ""
             
             # Телефоны
-            phone_elems = soup.find_all("div", {"class": "card-phones-view__number"})
-            result['phones'] = [phone.getText().strip() for phone in phone_elems] if phone_elems else []
+            phone_elems = elements[("div", "card-phones-view__number")]
+            result['phones'] = [phone.getText().strip() for phone in phone_elems]
             
             # Сайт
-            website_elem = soup.find("span", {"class": "business-urls-view__text"})
+            website_elem = self._first(elements, "span", "business-urls-view__text")
             result['website'] = website_elem.getText().strip() if website_elem else ""
             
             # Время работы
-            hours_elems = soup.find_all("meta", {"itemprop": "openingHours"})
-            result['hours'] = [time.get('content') for time in hours_elems] if hours_elems else []
+            hours_elems = elements[("meta", "openingHours")]
+            result['hours'] = [time.get('content') for time in hours_elems]
             
             # Рейтинг
-            rating_elem = soup.find("span", {"class": "business-summary-rating-badge-view__rating-text"})
+            rating_elem = self._first(elements, "span", "business-summary-rating-badge-view__rating-text")
             if rating_elem:
                 rating_text = rating_elem.getText().strip()
                 result['rating'] = float(rating_text) if rating_text else 0
@@ -51,44 +173,157 @@ class ExtendedSoupContentParser:
                 result['rating'] = 0
             
             # Количество отзывов
-            reviews_elem = soup.find("span", {"class": "business-reviews-view__review-count"})
+            reviews_elem = self._first(elements, "span", "business-reviews-view__review-count")
             if reviews_elem:
                 reviews_text = reviews_elem.getText().strip()
-                result['reviews_count'] = int(''.join(filter(str.isdigit, reviews_text))) if reviews_text else 0
+                result['reviews_count'] = int(NON_DIGIT_REGEX.sub('', reviews_text)) if reviews_text else 0
             else:
                 result['reviews_count'] = 0
             
             # Социальные сети
-            social_elems = soup.find_all("a", {"class": "button _view_secondary-gray _ui _size_medium _link"})
-            result['social_links'] = [link['href'] for link in social_elems] if social_elems else []
+            social_elems = elements[SOCIAL_LINK_KEY]
+            result['social_links'] = [link.get('href') for link in social_elems if link.get('href')]
             
         except Exception as e:
             logger.error(f"Ошибка при парсинге основной информации: {str(e)}")
         
         return result
     
+    def _index_elements(self, soup: BeautifulSoup, targets: frozenset = BASIC_INFO_TARGETS,
+                        with_hours: bool = True) -> Dict[Tuple[str, str], List[Tag]]:
+        """
+        Сбор элементов targets (подмножество BASIC_INFO_TARGETS) за один обход дерева.
+        
+        Returns:
+            Словарь (тег, класс) -> элементы в порядке документа; мета-теги времени
+            работы хранятся под ключом ("meta", "openingHours")
+        """
+        elements = defaultdict(list)
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            
+            if element.name == "meta":
+                if with_hours and element.get("itemprop") == "openingHours":
+                    elements[("meta", "openingHours")].append(element)
+                continue
+            
+            classes = element.get("class") or ()
+            for class_name in classes:
+                key = (element.name, class_name)
+                if key in targets and (key != SOCIAL_LINK_KEY or frozenset(classes) == SOCIAL_LINK_CLASSES):
+                    elements[key].append(element)
+        
+        return elements
+    
+    def _first(self, elements: Dict[Tuple[str, str], List[Tag]], tag: str, class_name: str) -> Optional[Tag]:
+        """Первый элемент с заданными тегом и классом или None."""
+        found = elements.get((tag, class_name))
+        return found[0] if found else None
+    
+    def iterparse_basic_info(self, html_stream: BinaryIO, encoding: str = 'utf-8') -> Dict[str, Any]:
+        """
+        Потоковый парсинг основной информации без построения полного дерева.
+        
+        Разобранные элементы вне целевых удаляются по мере чтения, поэтому пиковая
+        память не зависит от размера страницы. Результат совпадает с parse_basic_info.
+        
+        Args:
+            html_stream: Файловый объект с исходным кодом страницы в байтах
+            encoding: Кодировка страницы (парсер HTML libxml2 иначе предполагает latin-1)
+        
+        Returns:
+            Словарь с основной информацией об организации
+        """
+        # Текст (для ссылок соцсетей - href, для мета-тегов - content) по ключу (тег, класс)
+        values = defaultdict(list)
+        # Глубина вложенности в целевые элементы: их потомков удалять до извлечения текста нельзя
+        depth = 0
+        result = {}
+        
+        try:
+            for event, elem in etree.iterparse(html_stream, events=('start', 'end'), html=True,
+                                               recover=True, encoding=encoding):
+                keys = self._iterparse_keys(elem)
+                if event == 'start':
+                    depth += bool(keys)
+                    continue
+                
+                for key in keys:
+                    if key == SOCIAL_LINK_KEY:
+                        if elem.get('href'):
+                            values[key].append(elem.get('href'))
+                    elif key == ("meta", "openingHours"):
+                        values[key].append(elem.get('content'))
+                    else:
+                        values[key].append(''.join(elem.itertext()).strip())
+                
+                depth -= bool(keys)
+                if depth == 0:
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+            
+            def first(key):
+                return values[key][0] if values[key] else ""
+            
+            result['name'] = first(("h1", "orgpage-header-view__header"))
+            result['address'] = first(("a", "business-contacts-view__address-link"))
+            result['phones'] = values[("div", "card-phones-view__number")]
+            result['website'] = first(("span", "business-urls-view__text"))
+            result['hours'] = values[("meta", "openingHours")]
+            
+            rating_text = first(("span", "business-summary-rating-badge-view__rating-text"))
+            result['rating'] = float(rating_text) if rating_text else 0
+            
+            reviews_text = first(("span", "business-reviews-view__review-count"))
+            result['reviews_count'] = int(NON_DIGIT_REGEX.sub('', reviews_text)) if reviews_text else 0
+            
+            result['social_links'] = values[SOCIAL_LINK_KEY]
+            
+        except Exception as e:
+            logger.error(f"Ошибка при потоковом парсинге основной информации: {str(e)}")
+        
+        return result
+    
+    def _iterparse_keys(self, elem) -> List[Tuple[str, str]]:
+        """Ключи BASIC_INFO_TARGETS, которым соответствует элемент lxml."""
+        if elem.tag == "meta":
+            return [("meta", "openingHours")] if elem.get("itemprop") == "openingHours" else []
+        
+        class_value = elem.get("class")
+        if not class_value:
+            return []
+        classes = class_value.split()
+        return [(elem.tag, class_name) for class_name in classes
+                if (elem.tag, class_name) in BASIC_INFO_TARGETS
+                and ((elem.tag, class_name) != SOCIAL_LINK_KEY or frozenset(classes) == SOCIAL_LINK_CLASSES)]
+    
     def parse_additional_info(self, soup: BeautifulSoup) -> Dict[str, Any]:
-        """Парсинг дополнительной информации об организации."""
+        """Парсинг дополнительной информации об организации (CSS-селекторы компилируются один раз)."""
         result = {}
         
         try:
             # Категории
-            category_elems = soup.find_all("span", {"class": "breadcrumbs__item"})
+            category_elems = soup.select(SELECTORS['categories'])
             result['categories'] = [cat.getText().strip() for cat in category_elems][1:] if category_elems else []
             
             # Особенности
-            feature_elems = soup.find_all("div", {"class": "business-features-view__feature"})
+            feature_elems = soup.select(SELECTORS['features'])
             result['features'] = [feature.getText().strip() for feature in feature_elems] if feature_elems else []
             
             # Описание
-            desc_elem = soup.find("div", {"class": "business-description-view__text"})
+            desc_elem = soup.select_one(SELECTORS['description'])
             result['description'] = desc_elem.getText().strip() if desc_elem else ""
             
             # Оценка современности фасада
-            name = result.get('name', '').lower()
-            description = result.get('description', '').lower()
-            result['is_modern_facade'] = any(keyword in name or keyword in description 
-                                           for keyword in self.modern_keywords)
+            # Название и описание приводятся к нижнему регистру одной строкой;
+            # разделитель исключает совпадения на их стыке
+            text = f"{result.get('name', '')}\0{result.get('description', '')}".lower()
+            if self._keyword_automaton is not None:
+                result['is_modern_facade'] = next(self._keyword_automaton.iter(text), None) is not None
+            else:
+                result['is_modern_facade'] = any(keyword in text for keyword in self.modern_keywords)
             
         except Exception as e:
             logger.error(f"Ошибка при парсинге дополнительной информации: {str(e)}")
@@ -98,16 +333,41 @@ class ExtendedSoupContentParser:
     def extract_coordinates(self, soup: BeautifulSoup) -> Dict[str, Optional[float]]:
         """Извлечение координат из мета-тегов."""
         try:
-            meta_image = soup.find("meta", {"property": "og:image"})
+            meta_image = soup.select_one(SELECTORS['map_image'])
             if meta_image and 'content' in meta_image.attrs:
-                image_url = meta_image['content']
-                coord_match = re.search(r'll=([\d\.]+)%2C([\d\.]+)', image_url)
-                if coord_match:
-                    return {
-                        'longitude': float(coord_match.group(1)),
-                        'latitude': float(coord_match.group(2))
-                    }
+                return self._parse_coordinates(meta_image['content'])
         except Exception as e:
             logger.error(f"Ошибка при извлечении координат: {str(e)}")
         
         return {'longitude': None, 'latitude': None}
+    
+    def extract_coordinates_from_bytes(self, html: bytes) -> Dict[str, Optional[float]]:
+        """
+        Извлечение координат из мета-тегов напрямую из HTML, без построения BeautifulSoup.
+        
+        Args:
+            html: Исходный код страницы в байтах
+        
+        Returns:
+            Словарь с долготой и широтой (None, если координаты не найдены)
+        """
+        try:
+            # Парсер создается на каждый вызов: парсеры lxml нельзя разделять между потоками
+            parser = etree.HTMLParser(recover=True, remove_comments=True, remove_pis=True)
+            tree = etree.fromstring(html, parser)
+            if tree is not None:
+                return self._parse_coordinates(tree.xpath('string(//meta[@property="og:image"]/@content)'))
+        except Exception as e:
+            logger.error(f"Ошибка при извлечении координат: {str(e)}")
+        
+        return {'longitude': None, 'latitude': None}
+    
+    def _parse_coordinates(self, image_url: str) -> Dict[str, Optional[float]]:
+        """Координаты из URL изображения карты."""
+        coord_match = COORDINATES_REGEX.search(image_url)
+        if coord_match:
+            return {
+                'longitude': float(coord_match.group(1)),
+                'latitude': float(coord_match.group(2))
+            }
+        return {'longitude': None, 'latitude': None}
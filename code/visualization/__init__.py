@@ -2,10 +2,23 @@
 Пакет для визуализации данных анализа дистрибуции Т2.
 """
 
-from .map_visualizer import MapVisualizer
-from .chart_generator import ChartGenerator
-from .dashboard_builder import DashboardBuilder
-from .interactive_maps import InteractiveMapBuilder
+import importlib
+
+# Модули классов пакета. Модуль импортируется при первом обращении к классу:
+# импорт visualization.report_generator не загружает dash, plotly и folium
+_CLASS_MODULES = {
+    'MapVisualizer': '.map_visualizer',
+    'ChartGenerator': '.chart_generator',
+    'DashboardBuilder': '.dashboard_builder',
+    'InteractiveMapBuilder': '.interactive_maps'
+}
+
+def __getattr__(name):
+    if name in _CLASS_MODULES:
+        value = getattr(importlib.import_module(_CLASS_MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'MapVisualizer',
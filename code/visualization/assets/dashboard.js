@@ -0,0 +1,46 @@
+/*
+ * Клиентские callback'и дашборда анализа дистрибуции Т2.
+ */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        // Круговая диаграмма долей рынка по выбранным городам и операторам
+        // (data - количество салонов по парам город/оператор)
+        updateMarketShare: function (selectedCities, selectedOperators, data) {
+            var asList = function (value) {
+                if (!value) {
+                    return [];
+                }
+                return Array.isArray(value) ? value : [value];
+            };
+            var cities = new Set(asList(selectedCities));
+            var operators = new Set(asList(selectedOperators));
+            
+            var counts = {};
+            for (var i = 0; i < data.operator.length; i++) {
+                var operator = data.operator[i];
+                if (cities.size && !cities.has(data.city[i])) {
+                    continue;
+                }
+                if (operators.size && !operators.has(operator)) {
+                    continue;
+                }
+                counts[operator] = (counts[operator] || 0) + data.count[i];
+            }
+            
+            // Порядок по убыванию количества, как у value_counts
+            var names = Object.keys(counts).sort(function (a, b) {
+                return counts[b] - counts[a];
+            });
+            
+            return {
+                data: [{
+                    type: 'pie',
+                    labels: names,
+                    values: names.map(function (name) { return counts[name]; })
+                }],
+                layout: {title: {text: 'Доля рынка по операторам'}}
+            };
+        }
+    }
+});
@@ -2,18 +2,73 @@
 Модуль для создания графиков и диаграмм.
 """
 
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional
 from utils.logger import get_logger
+from utils.constants import identify_operators
 
 logger = get_logger(__name__)
 
+# Разрешение сохраняемых графиков по умолчанию (при 300 dpi растеризуется в 4 раза больше пикселей)
+DEFAULT_CHART_DPI = 150
+
+# Максимальное число точек на точечном графике (остальные не меняют вид, но замедляют отрисовку)
+SCATTER_MAX_POINTS = 5000
+
+# Параметры отрисовки при сохранении: упрощение линий и отрисовка длинных путей частями
+# (применяются только на время savefig, глобальные rcParams не меняются)
+SAVE_RC_PARAMS = {
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000
+}
+
+@functools.lru_cache(maxsize=64)
+def _husl_palette(n_colors: int) -> tuple:
+    """Палитра husl из n_colors цветов (кэшируется: графики строятся с одними и теми же размерами)."""
+    return tuple(sns.color_palette("husl", n_colors))
+
+# Методы ChartGenerator по типу графика (для create_all)
+CHART_METHODS = {
+    'bar': 'create_bar_chart',
+    'pie': 'create_pie_chart',
+    'line': 'create_line_chart',
+    'histogram': 'create_histogram',
+    'scatter': 'create_scatter_plot',
+    'box': 'create_box_plot',
+    'competitor_comparison': 'create_competitor_comparison',
+    'dashboard': 'create_dashboard'
+}
+
+# Генератор графиков рабочего процесса create_all (создается инициализатором пула)
+_worker_generator = None
+
+def _init_chart_worker(config: Dict[str, Any]) -> None:
+    """Инициализация рабочего процесса: один ChartGenerator на процесс."""
+    global _worker_generator
+    _worker_generator = ChartGenerator(config)
+
+def _render_one(spec: Dict[str, Any]) -> None:
+    """Построение одного графика по описанию {'kind', 'args', 'kwargs'} в рабочем процессе."""
+    method = getattr(_worker_generator, CHART_METHODS[spec['kind']])
+    method(*spec.get('args', ()), **spec.get('kwargs', {}))
+
 class ChartGenerator:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.dpi = config.get('chart_dpi', DEFAULT_CHART_DPI)
+        # Общая фигура для одиночных графиков (создается при первом графике)
+        self._fig = None
         self.set_style()
         
     def set_style(self) -> None:
@@ -26,6 +81,67 @@ class ChartGenerator:
         plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
         plt.rcParams['axes.unicode_minus'] = False
     
+    def _new_axes(self, figsize: tuple) -> Axes:
+        """
+        Подготовка общей фигуры к очередному графику.
+        
+        Фигура не создается заново для каждого графика, а очищается и меняет размер;
+        она рисуется собственным холстом Agg и не регистрируется в pyplot, поэтому
+        бэкенд pyplot не переключается, а закрывать фигуру после сохранения не нужно.
+        """
+        if self._fig is None:
+            self._fig = Figure()
+            FigureCanvasAgg(self._fig)
+        self._fig.clear()
+        self._fig.set_size_inches(*figsize)
+        return self._fig.add_subplot()
+    
+    def _save(self, output_path: str, fig: Optional[Figure] = None) -> None:
+        """Сохранение фигуры (по умолчанию общей)."""
+        with matplotlib.rc_context(SAVE_RC_PARAMS):
+            (fig or self._fig).savefig(output_path, dpi=self.dpi, bbox_inches='tight')
+    
+    def _sample_points(self, x_data, y_data) -> tuple:
+        """Случайная выборка SCATTER_MAX_POINTS точек (воспроизводимая) для больших наборов."""
+        x = np.asarray(x_data)
+        y = np.asarray(y_data)
+        if len(x) <= SCATTER_MAX_POINTS:
+            return x, y
+        
+        idx = np.random.default_rng(0).choice(len(x), SCATTER_MAX_POINTS, replace=False)
+        return x[idx], y[idx]
+    
+    def _bin_edges(self, values: np.ndarray, bins: int):
+        """Равномерные границы бинов по диапазону данных (число бинов, если диапазон пуст)."""
+        if len(values) == 0 or np.isnan(values).all():
+            return bins
+        
+        low, high = np.nanmin(values), np.nanmax(values)
+        if not (np.isfinite(low) and np.isfinite(high)) or low == high:
+            return bins
+        return np.linspace(low, high, bins + 1)
+    
+    def create_all(self, chart_specs: List[Dict[str, Any]]) -> None:
+        """
+        Параллельное построение набора независимых графиков в пуле процессов.
+        
+        Args:
+            chart_specs: Описания графиков: {'kind': ключ CHART_METHODS, 'args': [...], 'kwargs': {...}}
+        """
+        if not chart_specs:
+            return
+        
+        max_workers = min(len(chart_specs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_chart_worker,
+                                 initargs=(self.config,)) as executor:
+            list(executor.map(_render_one, chart_specs))
+        
+        logger.info(f"Построено графиков: {len(chart_specs)}")
+    
+    def close(self) -> None:
+        """Освобождение общей фигуры."""
+        self._fig = None
+    
     def create_bar_chart(self, data: Dict[str, Any], title: str, xlabel: str, ylabel: str, 
                         output_path: str, figsize: tuple = (10, 6)) -> None:
         """
@@ -39,26 +155,23 @@ class ChartGenerator:
             output_path: Путь для сохранения графика
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
         categories = list(data.keys())
         values = list(data.values())
         
-        bars = plt.bar(categories, values, color=sns.color_palette("husl", len(categories)))
+        bars = ax.bar(categories, values, color=_husl_palette(len(categories)))
         
         # Добавление значений на столбцы
-        for bar, value in zip(bars, values):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01, 
-                    f'{value}', ha='center', va='bottom')
+        ax.bar_label(bars, labels=[f'{value}' for value in values], padding=3)
         
-        plt.title(title, fontsize=16, pad=20)
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        ax.set_title(title, fontsize=16, pad=20)
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        self._fig.tight_layout()
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Столбчатая диаграмма сохранена в {output_path}")
     
@@ -73,7 +186,7 @@ class ChartGenerator:
             output_path: Путь для сохранения графика
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
         labels = list(data.keys())
         values = list(data.values())
@@ -81,13 +194,12 @@ class ChartGenerator:
         # Автоматическое выделение секторов с малыми значениями
         explode = [0.1 if value/sum(values) < 0.05 else 0 for value in values]
         
-        plt.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, 
-                explode=explode, shadow=True)
-        plt.axis('equal')
-        plt.title(title, fontsize=16, pad=20)
+        ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, 
+               explode=explode, shadow=True)
+        ax.axis('equal')
+        ax.set_title(title, fontsize=16, pad=20)
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Круговая диаграмма сохранена в {output_path}")
     
@@ -105,17 +217,16 @@ class ChartGenerator:
             output_path: Путь для сохранения графика
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
-        plt.plot(x_data, y_data, marker='o', linewidth=2, markersize=6)
+        ax.plot(x_data, y_data, marker='o', linewidth=2, markersize=6)
         
-        plt.title(title, fontsize=16, pad=20)
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
+        ax.set_title(title, fontsize=16, pad=20)
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Линейный график сохранен в {output_path}")
     
@@ -133,17 +244,18 @@ class ChartGenerator:
             bins: Количество бинов
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
-        plt.hist(data, bins=bins, alpha=0.7, edgecolor='black')
+        # Данные переводятся в массив один раз; границы бинов считаются заранее
+        values = np.asarray(data, dtype=np.float64)
+        ax.hist(values, bins=self._bin_edges(values, bins), alpha=0.7, edgecolor='black')
         
-        plt.title(title, fontsize=16, pad=20)
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
+        ax.set_title(title, fontsize=16, pad=20)
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Гистограмма сохранена в {output_path}")
     
@@ -161,17 +273,16 @@ class ChartGenerator:
             output_path: Путь для сохранения графика
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
-        plt.scatter(x_data, y_data, alpha=0.6, edgecolors='w', s=50)
+        ax.scatter(*self._sample_points(x_data, y_data), alpha=0.6, edgecolors='w', s=50)
         
-        plt.title(title, fontsize=16, pad=20)
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
+        ax.set_title(title, fontsize=16, pad=20)
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Точечный график сохранен в {output_path}")
     
@@ -187,19 +298,18 @@ class ChartGenerator:
             output_path: Путь для сохранения графика
             figsize: Размер фигуры
         """
-        plt.figure(figsize=figsize)
+        ax = self._new_axes(figsize)
         
         categories = list(data.keys())
-        values = list(data.values())
+        values = [np.asarray(group, dtype=np.float64) for group in data.values()]
         
-        plt.boxplot(values, labels=categories)
+        ax.boxplot(values, labels=categories)
         
-        plt.title(title, fontsize=16, pad=20)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
+        ax.set_title(title, fontsize=16, pad=20)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
         
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save(output_path)
         
         logger.info(f"Box-plot диаграмма сохранена в {output_path}")
     
@@ -214,65 +324,50 @@ class ChartGenerator:
             metrics: Список метрик для сравнения
         """
         # Идентификация операторов
-        df['operator'] = df['name'].apply(self._identify_operator)
+        df['operator'] = identify_operators(df['name'])
         
         # Создание подграфиков
         n_metrics = len(metrics)
-        fig, axes = plt.subplots(1, n_metrics, figsize=(5 * n_metrics, 6))
+        fig = Figure(figsize=(5 * n_metrics, 6))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(1, n_metrics, squeeze=False)[0]
         
-        if n_metrics == 1:
-            axes = [axes]
+        # Группировка по операторам и расчет средних значений всех метрик за один проход
+        means = df.groupby('operator', observed=True)[[metric for metric in metrics if metric in df.columns]].mean()
         
         for i, metric in enumerate(metrics):
-            if metric in df.columns:
-                # Группировка по операторам и расчет средних значений
-                operator_means = df.groupby('operator')[metric].mean()
+            if metric in means.columns:
+                operator_means = means[metric]
                 
                 axes[i].bar(operator_means.index, operator_means.values, 
-                           color=sns.color_palette("husl", len(operator_means)))
+                           color=_husl_palette(len(operator_means)))
                 axes[i].set_title(f'Сравнение по {metric}', fontsize=14)
                 axes[i].set_ylabel('Среднее значение', fontsize=12)
                 axes[i].tick_params(axis='x', rotation=45)
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        self._save(output_path, fig)
         
         logger.info(f"График сравнения конкурентов сохранен в {output_path}")
     
-    def _identify_operator(self, name: str) -> str:
-        """
-        Идентификация оператора по названию.
-        
-        Args:
-            name: Название салона связи
-            
-        Returns:
-            Идентифицированный оператор
-        """
-        name_lower = str(name).lower()
-        
-        if 'tele2' in name_lower or 'т2' in name_lower:
-            return 'Tele2'
-        elif 'мтс' in name_lower or 'mts' in name_lower:
-            return 'МТС'
-        elif 'билайн' in name_lower or 'beeline' in name_lower:
-            return 'Билайн'
-        elif 'мегафон' in name_lower or 'megafon' in name_lower:
-            return 'МегаФон'
-        else:
-            return 'Другой'
-    
-    def create_dashboard(self, analysis_results: Dict[str, Any], output_path: str) -> None:
+    def create_dashboard(self, analysis_results: Dict[str, Any], output_path: str,
+                         df: Optional[pd.DataFrame] = None) -> None:
         """
         Создание дашборда с основными графиками.
         
         Args:
             analysis_results: Результаты анализа
             output_path: Путь для сохранения дашборда
+            df: DataFrame с данными о салонах связи (для графиков рейтингов и отзывов)
         """
+        if df is None:
+            df = pd.DataFrame()
+        elif 'operator' not in df.columns and 'name' in df.columns:
+            df = df.assign(operator=identify_operators(df['name']))
+        
         # Создание комплексного дашборда
-        fig = plt.figure(figsize=(16, 12))
+        fig = Figure(figsize=(16, 12))
+        FigureCanvasAgg(fig)
         
         # Определение layout дашборда
         gs = fig.add_gridspec(3, 3)
@@ -311,12 +406,10 @@ class ChartGenerator:
         ax4 = fig.add_subplot(gs[1, 0])
         if 'competitor_analysis' in analysis_results:
             operator_data = analysis_results['competitor_analysis'].get('operator_stats', {})
-            if operator_data and 'rating' in df.columns:
-                rating_data = {}
-                for operator in operator_data.keys():
-                    operator_ratings = df[df['operator'] == operator]['rating'].dropna()
-                    if len(operator_ratings) > 0:
-                        rating_data[operator] = operator_ratings
+            if operator_data and 'rating' in df.columns and 'operator' in df.columns:
+                # Рейтинги всех операторов за одну группировку (в порядке operator_stats)
+                ratings = df.dropna(subset=['rating']).groupby('operator', observed=True)['rating'].agg(list)
+                rating_data = {operator: ratings[operator] for operator in operator_data if operator in ratings.index}
                 
                 ax4.boxplot(rating_data.values(), labels=rating_data.keys())
                 ax4.set_title('Сравнение рейтингов по операторам')
@@ -325,7 +418,7 @@ class ChartGenerator:
         # 5. График зависимости рейтинга от количества отзывов (нижний центральный)
         ax5 = fig.add_subplot(gs[1, 1:])
         if 'rating' in df.columns and 'reviews_count' in df.columns:
-            ax5.scatter(df['reviews_count'], df['rating'], alpha=0.5)
+            ax5.scatter(*self._sample_points(df['reviews_count'], df['rating']), alpha=0.5)
             ax5.set_title('Зависимость рейтинга от количества отзывов')
             ax5.set_xlabel('Количество отзывов')
             ax5.set_ylabel('Рейтинг')
@@ -343,8 +436,7 @@ class ChartGenerator:
                 ax6.text(0.05, 0.95, summary_text, transform=ax6.transAxes, fontsize=10, 
                         verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
         
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.tight_layout()
+        self._save(output_path, fig)
         
         logger.info(f"Дашборд сохранен в {output_path}")
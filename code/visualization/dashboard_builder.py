@@ -2,18 +2,37 @@
 Модуль для создания интерактивных дашбордов.
 """
 
+from pathlib import Path
 import pandas as pd
+import numpy as np
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from typing import Dict, List, Any
 from utils.logger import get_logger
+from utils.constants import identify_operators
+from visualization.interactive_maps import maybe_downsample
 
 logger = get_logger(__name__)
 
+# Статическая HTML-заглушка дашборда (закодирована в UTF-8 один раз при импорте)
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Дашборд анализа дистрибуции Т2</title>
+    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+</head>
+<body>
+    <h1>Дашборд анализа дистрибуции Т2</h1>
+    <p>Для полной функциональности запустите дашборд через Dash сервер</p>
+</body>
+</html>
+""".encode('utf-8')
+
 class DashboardBuilder:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -35,7 +54,12 @@ class DashboardBuilder:
         logger.info("Создание интерактивного дашборда")
         
         # Идентификация операторов
-        df['operator'] = df['name'].apply(self._identify_operator)
+        df['operator'] = identify_operators(df['name'])
+        
+        # Колонки с небольшим числом значений хранятся категориями:
+        # value_counts, isin и группировки работают по целочисленным кодам
+        df['city'] = df['city'].astype('category')
+        df['operator'] = df['operator'].astype('category')
         
         # Создание layout дашборда
         self.app.layout = self._create_dashboard_layout(df, analysis_results)
@@ -66,6 +90,9 @@ class DashboardBuilder:
         layout = html.Div([
             html.H1("Анализ дистрибуционной сети Т2", style={'textAlign': 'center'}),
             
+            # Данные для фильтрации графиков в браузере
+            dcc.Store(id='full-data', data=self._market_share_data(df)),
+            
             # Первый ряд: Общая статистика
             html.Div([
                 html.Div([
@@ -76,7 +103,7 @@ class DashboardBuilder:
                 # Второй ряд: Графики
                 html.Div([
                     html.Div([
-                        dcc.Graph(figure=graphs['market_share'])
+                        dcc.Graph(id='market_share', figure=graphs['market_share'])
                     ], className='six columns'),
                     
                     html.Div([
@@ -151,7 +178,7 @@ class DashboardBuilder:
         )
         
         # 2. Столбчатая диаграмма распределения по городам
-        city_counts = df['city'].value_counts().head(10)  # Топ-10 городов
+        city_counts = self._top_k(df['city'].value_counts(sort=False), 10)  # Топ-10 городов
         graphs['city_distribution'] = px.bar(
             x=city_counts.index,
             y=city_counts.values,
@@ -160,13 +187,7 @@ class DashboardBuilder:
         )
         
         # 3. Box-plot сравнения рейтингов
-        rating_data = []
-        for operator in df['operator'].unique():
-            operator_ratings = df[df['operator'] == operator]['rating'].dropna()
-            for rating in operator_ratings:
-                rating_data.append({'operator': operator, 'rating': rating})
-        
-        rating_df = pd.DataFrame(rating_data)
+        rating_df = df[['operator', 'rating']].dropna(subset=['rating'])
         graphs['rating_comparison'] = px.box(
             rating_df, 
             x='operator', 
@@ -187,7 +208,7 @@ class DashboardBuilder:
                 )
         
         # 5. Карта покрытия
-        tele2_df = df[df['operator'] == 'Tele2']
+        tele2_df = maybe_downsample(df[df['operator'] == 'Tele2'])
         graphs['coverage_map'] = px.scatter_mapbox(
             tele2_df,
             lat='latitude',
@@ -201,6 +222,26 @@ class DashboardBuilder:
         
         return graphs
     
+    def _top_k(self, counts: pd.Series, k: int) -> pd.Series:
+        """
+        k наибольших значений по убыванию без полной сортировки.
+        
+        Args:
+            counts: Несортированные количества (результат value_counts(sort=False))
+            k: Число значений
+            
+        Returns:
+            Series из k наибольших количеств
+        """
+        values = counts.to_numpy()
+        if len(values) > k:
+            idx = np.argpartition(-values, k)[:k]
+        else:
+            idx = np.arange(len(values))
+        
+        idx = idx[np.argsort(-values[idx], kind='stable')]
+        return counts.iloc[idx]
+    
     def _create_summary_cards(self, analysis_results: Dict[str, Any]) -> html.Div:
         """
         Создание карточек с общей статистикой.
@@ -263,60 +304,40 @@ class DashboardBuilder:
         """
         Добавление callback'ов для интерактивности.
         
+        Фильтрация и подсчет долей рынка выполняются в браузере (assets/dashboard.js)
+        по данным из dcc.Store 'full-data': смена фильтра не требует запроса к серверу.
+        
         Args:
             df: DataFrame с данными
         """
-        @self.app.callback(
+        self.app.clientside_callback(
+            ClientsideFunction(namespace='dashboard', function_name='updateMarketShare'),
             Output('market_share', 'figure'),
             [Input('city-filter', 'value'),
-             Input('operator-filter', 'value')]
+             Input('operator-filter', 'value')],
+            [State('full-data', 'data')]
         )
-        def update_market_share(selected_cities, selected_operators):
-            # Фильтрация данных
-            filtered_df = df.copy()
-            
-            if selected_cities:
-                if isinstance(selected_cities, str):
-                    selected_cities = [selected_cities]
-                filtered_df = filtered_df[filtered_df['city'].isin(selected_cities)]
-            
-            if selected_operators:
-                if isinstance(selected_operators, str):
-                    selected_operators = [selected_operators]
-                filtered_df = filtered_df[filtered_df['operator'].isin(selected_operators)]
-            
-            # Обновление графика
-            operator_counts = filtered_df['operator'].value_counts()
-            fig = px.pie(
-                values=operator_counts.values,
-                names=operator_counts.index,
-                title='Доля рынка по операторам'
-            )
-            
-            return fig
     
-    def _identify_operator(self, name: str) -> str:
+    def _market_share_data(self, df: pd.DataFrame) -> Dict[str, list]:
         """
-        Идентификация оператора по названию.
+        Количество салонов по парам (город, оператор) для клиентского callback'а долей рынка.
+        
+        В браузер передаются только агрегаты, по которым фильтрует callback, а не строки DataFrame.
         
         Args:
-            name: Название салона связи
+            df: DataFrame с данными
             
         Returns:
-            Идентифицированный оператор
+            Словарь {'city': [...], 'operator': [...], 'count': [...]} (пропуски - None)
         """
-        name_lower = str(name).lower()
-        
-        if 'tele2' in name_lower or 'т2' in name_lower:
-            return 'Tele2'
-        elif 'мтс' in name_lower or 'mts' in name_lower:
-            return 'МТС'
-        elif 'билайн' in name_lower or 'beeline' in name_lower:
-            return 'Билайн'
-        elif 'мегафон' in name_lower or 'megafon' in name_lower:
-            return 'МегаФон'
-        else:
-            return 'Другой'
+        counts = df[['city', 'operator']].astype(object).value_counts(dropna=False, sort=False)
+        keys = counts.index.to_frame(index=False)
+        keys = keys.astype(object).where(keys.notna(), None)
+        return {
+            'city': keys['city'].tolist(),
+            'operator': keys['operator'].tolist(),
+            'count': counts.to_numpy().tolist()
+        }
     
     def _save_dashboard_as_html(self, output_path: str) -> None:
         """
@@ -327,20 +348,7 @@ class DashboardBuilder:
         """
         # Для сохранения дашборда как HTML, нам нужно отрендерить его
         # В реальном проекте это может быть сложнее, поэтому здесь упрощенная версия
-        with open(output_path, 'w') as f:
-            f.write("""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Дашборд анализа дистрибуции Т2</title>
-                <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-            </head>
-            <body>
-                <h1>Дашборд анализа дистрибуции Т2</h1>
-                <p>Для полной функциональности запустите дашборд через Dash сервер</p>
-            </body>
-            </html>
-            """)
+        Path(output_path).write_bytes(DASHBOARD_HTML)
         
         logger.info(f"Дашборд сохранен в {output_path}")
     
@@ -2,17 +2,53 @@
 Модуль для создания интерактивных карт с использованием Plotly.
 """
 
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
-from typing import Dict, List, Any
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
 from utils.logger import get_logger
+from utils.constants import TELE2_NAME_REGEX, identify_operators
 
 logger = get_logger(__name__)
 
+# Максимальное число точек на карте Plotly (большие наборы прореживаются выборкой)
+MAP_MAX_POINTS = 5000
+
+# Количество построенных карт, хранимых в кэше InteractiveMapBuilder
+FIGURE_CACHE_SIZE = 4
+
+def maybe_downsample(df: pd.DataFrame, max_points: int = MAP_MAX_POINTS) -> pd.DataFrame:
+    """
+    Воспроизводимая случайная выборка точек для карты.
+    
+    Plotly сериализует в JSON и отрисовывает каждую точку: для плотных городов
+    на карту передается не более max_points салонов.
+    
+    Args:
+        df: DataFrame с данными
+        max_points: Максимальное число точек
+        
+    Returns:
+        Исходный DataFrame или выборка из него
+    """
+    if len(df) <= max_points:
+        return df
+    
+    logger.info(f"На карту выведено {max_points} из {len(df)} точек")
+    return df.sample(max_points, random_state=0)
+
 class InteractiveMapBuilder:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        # Построенные карты (LRU): (тип карты, хэш данных) -> (фигура, путь сохраненного HTML)
+        self._figure_cache: 'OrderedDict[Tuple[str, str], Tuple[go.Figure, Optional[str]]]' = OrderedDict()
         
     def create_interactive_coverage_map(self, df: pd.DataFrame, output_path: str = None) -> go.Figure:
         """
@@ -27,29 +63,37 @@ class InteractiveMapBuilder:
         """
         logger.info("Создание интерактивной карты покрытия")
         
+        # Для тех же данных карта не строится повторно
+        cache_key = ('coverage', self._data_hash(df, ['name', 'latitude', 'longitude', 'address', 'rating', 'reviews_count']))
+        if cache_key in self._figure_cache:
+            return self._reuse_figure(cache_key, output_path)
+        
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
+        tele2_df = maybe_downsample(df[self._tele2_mask(df)])
         
-        # Создание карты
-        fig = px.scatter_mapbox(
-            tele2_df,
-            lat='latitude',
-            lon='longitude',
-            hover_name='name',
-            hover_data=['address', 'rating', 'reviews_count'],
-            color='rating',
-            color_continuous_scale=px.colors.sequential.Viridis,
-            zoom=10,
-            title='Интерактивная карта покрытия Т2'
-        )
+        # Создание карты напрямую из массивов, без разбора DataFrame в Plotly Express
+        rating = tele2_df['rating'].to_numpy()
+        fig = go.Figure(go.Scattermapbox(
+            lat=tele2_df['latitude'].to_numpy(),
+            lon=tele2_df['longitude'].to_numpy(),
+            mode='markers',
+            marker=dict(color=rating, colorscale='Viridis', showscale=True, colorbar=dict(title='rating')),
+            text=tele2_df['name'].to_numpy(),
+            customdata=tele2_df[['address', 'rating', 'reviews_count']].to_numpy(dtype=object),
+            hovertemplate=('<b>%{text}</b><br>address=%{customdata[0]}<br>rating=%{customdata[1]}'
+                           '<br>reviews_count=%{customdata[2]}<extra></extra>')
+        ))
         
+        fig.update_layout(title='Интерактивная карта покрытия Т2',
+                          mapbox=dict(center=self._map_center(tele2_df), zoom=10))
         fig.update_layout(mapbox_style="open-street-map")
         fig.update_layout(margin={"r": 0, "t": 30, "l": 0, "b": 0})
         
         if output_path:
-            fig.write_html(output_path)
+            self._write_html(fig, output_path)
             logger.info(f"Интерактивная карта сохранена в {output_path}")
         
+        self._cache_figure(cache_key, fig, output_path)
         return fig
     
     def create_animated_map(self, df: pd.DataFrame, output_path: str = None) -> go.Figure:
@@ -65,8 +109,13 @@ class InteractiveMapBuilder:
         """
         logger.info("Создание анимированной карты развития сети")
         
+        # Для тех же данных карта не строится повторно
+        cache_key = ('animated', self._data_hash(df, ['name', 'latitude', 'longitude', 'address', 'rating', 'established_year']))
+        if cache_key in self._figure_cache:
+            return self._reuse_figure(cache_key, output_path)
+        
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)].copy()
+        tele2_df = maybe_downsample(df[self._tele2_mask(df)]).copy()
         
         # Добавление данных для анимации (заглушка)
         # В реальном проекте здесь должны быть исторические данные
@@ -91,9 +140,10 @@ class InteractiveMapBuilder:
         fig.update_layout(margin={"r": 0, "t": 30, "l": 0, "b": 0})
         
         if output_path:
-            fig.write_html(output_path)
+            self._write_html(fig, output_path)
             logger.info(f"Анимированная карта сохранена в {output_path}")
         
+        self._cache_figure(cache_key, fig, output_path)
         return fig
     
     def create_competitor_map(self, df: pd.DataFrame, output_path: str = None) -> go.Figure:
@@ -109,49 +159,137 @@ class InteractiveMapBuilder:
         """
         logger.info("Создание карты с отображением конкурентов")
         
-        # Идентификация операторов
-        df['operator'] = df['name'].apply(self._identify_operator)
+        # Идентификация операторов (колонка добавляется и при карте из кэша)
+        df['operator'] = identify_operators(df['name'])
         
-        # Создание карты
-        fig = px.scatter_mapbox(
-            df,
-            lat='latitude',
-            lon='longitude',
-            hover_name='name',
-            hover_data=['address', 'rating'],
-            color='operator',
-            zoom=10,
-            title='Карта конкурентов'
-        )
+        # Для тех же данных карта не строится повторно
+        cache_key = ('competitor', self._data_hash(df, ['name', 'latitude', 'longitude', 'address', 'rating']))
+        if cache_key in self._figure_cache:
+            return self._reuse_figure(cache_key, output_path)
+        
+        # Создание карты: по одному слою на оператора из массивов его салонов
+        map_df = maybe_downsample(df)
+        fig = go.Figure()
+        for operator, operator_df in map_df.groupby('operator', sort=False, observed=True):
+            fig.add_trace(go.Scattermapbox(
+                lat=operator_df['latitude'].to_numpy(),
+                lon=operator_df['longitude'].to_numpy(),
+                mode='markers',
+                name=operator,
+                text=operator_df['name'].to_numpy(),
+                customdata=operator_df[['address', 'rating']].to_numpy(dtype=object),
+                hovertemplate=('<b>%{text}</b><br>address=%{customdata[0]}'
+                               '<br>rating=%{customdata[1]}<extra></extra>')
+            ))
         
+        fig.update_layout(title='Карта конкурентов', legend_title_text='operator',
+                          mapbox=dict(center=self._map_center(map_df), zoom=10))
         fig.update_layout(mapbox_style="open-street-map")
         fig.update_layout(margin={"r": 0, "t": 30, "l": 0, "b": 0})
         
         if output_path:
-            fig.write_html(output_path)
+            self._write_html(fig, output_path)
             logger.info(f"Карта конкурентов сохранена в {output_path}")
         
+        self._cache_figure(cache_key, fig, output_path)
+        return fig
+    
+    def _write_html(self, fig: go.Figure, output_path: str) -> None:
+        """
+        Сохранение карты в HTML.
+        
+        Фигура сериализуется без повторной проверки атрибутов (они проверены при построении);
+        библиотека plotly.js встраивается в файл, поэтому карта открывается без сети.
+        
+        Args:
+            fig: Карта Plotly
+            output_path: Путь для сохранения
+        """
+        html = pio.to_html(fig, include_plotlyjs=True, full_html=True, validate=False)
+        Path(output_path).write_bytes(html.encode('utf-8'))
+    
+    def _map_center(self, df: pd.DataFrame) -> Dict[str, float]:
+        """
+        Центр карты - среднее координат салонов (как при автоматическом выборе в Plotly Express).
+        
+        Args:
+            df: DataFrame с координатами
+            
+        Returns:
+            Словарь {'lat': широта, 'lon': долгота}
+        """
+        coords = np.asarray(df[['latitude', 'longitude']], dtype=np.float64)
+        valid = ~np.isnan(coords).any(axis=1)
+        
+        if not valid.any():
+            return {'lat': 55.7558, 'lon': 37.6173}  # Москва по умолчанию
+        
+        center_lat, center_lon = coords[valid].mean(axis=0)
+        return {'lat': float(center_lat), 'lon': float(center_lon)}
+    
+    def _data_hash(self, df: pd.DataFrame, columns: List[str]) -> str:
+        """
+        Хэш содержимого колонок, от которых зависит карта.
+        
+        Args:
+            df: DataFrame с данными
+            columns: Колонки, используемые картой (отсутствующие пропускаются)
+            
+        Returns:
+            Хэш MD5 в шестнадцатеричном виде
+        """
+        present = [column for column in columns if column in df.columns]
+        row_hashes = pd.util.hash_pandas_object(df[present], index=False).to_numpy()
+        return hashlib.md5(row_hashes.tobytes()).hexdigest()
+    
+    def _reuse_figure(self, cache_key: Tuple[str, str], output_path: Optional[str]) -> go.Figure:
+        """
+        Возврат ранее построенной карты с сохранением HTML по новому пути.
+        
+        Args:
+            cache_key: Ключ кэша карт
+            output_path: Путь для сохранения карты (опционально)
+            
+        Returns:
+            Карта Plotly из кэша
+        """
+        fig, html_path = self._figure_cache[cache_key]
+        self._figure_cache.move_to_end(cache_key)
+        
+        if output_path and (output_path != html_path or not os.path.exists(output_path)):
+            if html_path and os.path.exists(html_path):
+                # Готовый HTML копируется без повторной сериализации фигуры
+                shutil.copyfile(html_path, output_path)
+            else:
+                self._write_html(fig, output_path)
+                self._cache_figure(cache_key, fig, output_path)
+            logger.info(f"Карта из кэша сохранена в {output_path}")
+        
         return fig
     
-    def _identify_operator(self, name: str) -> str:
+    def _cache_figure(self, cache_key: Tuple[str, str], fig: go.Figure, output_path: Optional[str]) -> None:
         """
-        Идентификация оператора по названию.
+        Добавление карты в кэш с вытеснением давно не использованных карт.
         
         Args:
-            name: Название салона связи
+            cache_key: Ключ кэша карт
+            fig: Карта Plotly
+            output_path: Путь сохраненного HTML (опционально)
+        """
+        self._figure_cache[cache_key] = (fig, output_path)
+        self._figure_cache.move_to_end(cache_key)
+        if len(self._figure_cache) > FIGURE_CACHE_SIZE:
+            self._figure_cache.popitem(last=False)
+    
+    def _tele2_mask(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Маска салонов Т2 по названию.
+        
+        Args:
+            df: DataFrame с данными
             
         Returns:
-            Идентифицированный оператор
-        """
-        name_lower = str(name).lower()
-        
-        if 'tele2' in name_lower or 'т2' in name_lower:
-            return 'Tele2'
-        elif 'мтс' in name_lower or 'mts' in name_lower:
-            return 'МТС'
-        elif 'билайн' in name_lower or 'beeline' in name_lower:
-            return 'Билайн'
-        elif 'мегафон' in name_lower or 'megafon' in name_lower:
-            return 'МегаФон'
-        else:
-            return 'Другой'
+            Булева маска салонов Т2
+        """
+        return df['name'].str.contains(TELE2_NAME_REGEX, na=False)
+    
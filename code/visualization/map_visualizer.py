@@ -4,12 +4,33 @@
 
 import folium
 from folium import plugins
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional
 from utils.logger import get_logger
+from utils.constants import identify_operators
 
 logger = get_logger(__name__)
 
+# JS-функция FastMarkerCluster: маркер строится в браузере из строки [широта, долгота, подсказка]
+# (%s - цвет маркера)
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', prefix: 'glyphicon', markerColor: '%s'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[2], {maxWidth: 300});
+    return marker;
+}
+"""
+
+# Поля всплывающей подсказки маркера и значения для пропусков и отсутствующих колонок
+POPUP_FIELDS = [
+    ('name', 'Неизвестно'),
+    ('address', 'Неизвестно'),
+    ('rating', 'Нет данных'),
+    ('reviews_count', 0)
+]
+
 class MapVisualizer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -33,11 +54,13 @@ class MapVisualizer:
         """
         logger.info("Создание карты покрытия")
         
-        # Фильтрация салонов по операторам
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
-        mts_df = df[df['name'].str.contains('МТС|MTS', case=False, na=False)]
-        beeline_df = df[df['name'].str.contains('Билайн|Beeline', case=False, na=False)]
-        megafon_df = df[df['name'].str.contains('МегаФон|Megafon', case=False, na=False)]
+        # Разбиение салонов по операторам одной группировкой
+        groups = dict(tuple(df.groupby(self._operator_labels(df), sort=False)))
+        empty_df = df.iloc[:0]
+        tele2_df = groups.get('Tele2', empty_df)
+        mts_df = groups.get('МТС', empty_df)
+        beeline_df = groups.get('Билайн', empty_df)
+        megafon_df = groups.get('МегаФон', empty_df)
         
         # Определение центра карты
         center_lat, center_lon = self._calculate_map_center(tele2_df)
@@ -81,14 +104,19 @@ class MapVisualizer:
         logger.info("Создание тепловой карты")
         
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
-        
-        # Подготовка данных для тепловой карты
-        heat_data = []
-        for _, row in tele2_df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                intensity = row.get(intensity_column, 1) if intensity_column in row else 1
-                heat_data.append([row['latitude'], row['longitude'], intensity])
+        tele2_df = df[self._operator_labels(df) == 'Tele2']
+        
+        # Подготовка данных для тепловой карты (колонками, без построчного обхода)
+        valid_df = tele2_df.dropna(subset=['latitude', 'longitude'])
+        if intensity_column in valid_df.columns:
+            intensities = valid_df[intensity_column].to_numpy()
+        else:
+            intensities = np.ones(len(valid_df))
+        heat_data = np.column_stack([
+            valid_df['latitude'].to_numpy(),
+            valid_df['longitude'].to_numpy(),
+            intensities
+        ]).tolist()
         
         # Создание базовой карты
         center_lat, center_lon = self._calculate_map_center(tele2_df)
@@ -117,30 +145,21 @@ class MapVisualizer:
         logger.info("Создание кластерной карты")
         
         # Фильтрация салонов Т2
-        tele2_df = df[df['name'].str.contains('Tele2|Т2', case=False, na=False)]
+        tele2_df = df[self._operator_labels(df) == 'Tele2']
         
         # Создание базовой карты
         center_lat, center_lon = self._calculate_map_center(tele2_df)
         m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
         
-        # Создание кластеров
-        marker_cluster = plugins.MarkerCluster().add_to(m)
-        
-        # Добавление маркеров в кластеры
-        for _, row in tele2_df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                popup_text = f"""
-                <b>{row.get('name', 'Неизвестно')}</b><br>
-                Адрес: {row.get('address', 'Неизвестно')}<br>
-                Рейтинг: {row.get('rating', 'Нет данных')}<br>
-                Отзывы: {row.get('reviews_count', 0)}
-                """
-                
-                folium.Marker(
-                    [row['latitude'], row['longitude']],
-                    popup=folium.Popup(popup_text, max_width=300),
-                    icon=folium.Icon(color=self.colors['tele2'], icon='info-sign')
-                ).add_to(marker_cluster)
+        # Создание кластеров: в HTML передается только массив координат и подсказок,
+        # маркеры создаются в браузере, а не отдельными объектами folium.Marker
+        valid_df = tele2_df.dropna(subset=['latitude', 'longitude'])
+        data = [list(row) for row in zip(valid_df['latitude'].tolist(), valid_df['longitude'].tolist(),
+                                         self._popup_texts(valid_df).tolist())]
+        plugins.FastMarkerCluster(
+            data,
+            callback=CLUSTER_MARKER_CALLBACK % self.colors['tele2']
+        ).add_to(m)
         
         # Сохранение карты
         m.save(output_path)
@@ -148,6 +167,18 @@ class MapVisualizer:
         
         return m
     
+    def _operator_labels(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Оператор каждого салона по названию (в порядке приоритета OPERATOR_PATTERNS).
+        
+        Args:
+            df: DataFrame с данными
+            
+        Returns:
+            Массив меток операторов ('Другой' для остальных салонов)
+        """
+        return np.asarray(identify_operators(df['name']), dtype=object)
+    
     def _calculate_map_center(self, df: pd.DataFrame) -> tuple:
         """
         Расчет центра карты на основе данных.
@@ -158,18 +189,16 @@ class MapVisualizer:
         Returns:
             Кортеж (широта, долгота) центра карты
         """
-        if len(df) == 0:
-            return (55.7558, 37.6173)  # Москва по умолчанию
+        # Один проход по массиву координат без промежуточного DataFrame
+        coords = np.asarray(df[['latitude', 'longitude']], dtype=np.float64)
+        valid = ~np.isnan(coords).any(axis=1)
         
-        valid_coords = df[~pd.isna(df['latitude']) & ~pd.isna(df['longitude'])]
-        
-        if len(valid_coords) == 0:
+        if not valid.any():
             return (55.7558, 37.6173)  # Москва по умолчанию
         
-        center_lat = valid_coords['latitude'].mean()
-        center_lon = valid_coords['longitude'].mean()
+        center_lat, center_lon = coords[valid].mean(axis=0)
         
-        return (center_lat, center_lon)
+        return (float(center_lat), float(center_lon))
     
     def _add_locations_to_map(self, map_obj: folium.Map, df: pd.DataFrame, 
                              layer_name: str, color: str, icon: str) -> None:
@@ -185,23 +214,40 @@ class MapVisualizer:
         """
         feature_group = folium.FeatureGroup(name=layer_name)
         
-        for _, row in df.iterrows():
-            if not pd.isna(row['latitude']) and not pd.isna(row['longitude']):
-                popup_text = f"""
-                <b>{row.get('name', 'Неизвестно')}</b><br>
-                Адрес: {row.get('address', 'Неизвестно')}<br>
-                Рейтинг: {row.get('rating', 'Нет данных')}<br>
-                Отзывы: {row.get('reviews_count', 0)}
-                """
-                
-                folium.Marker(
-                    [row['latitude'], row['longitude']],
-                    popup=folium.Popup(popup_text, max_width=300),
-                    icon=folium.Icon(color=color, icon=icon)
-                ).add_to(feature_group)
+        # Обход колонками: без построения Series для каждой строки, как в iterrows
+        valid_df = df.dropna(subset=['latitude', 'longitude'])
+        for lat, lon, popup_text in zip(valid_df['latitude'].to_numpy(), valid_df['longitude'].to_numpy(),
+                                        self._popup_texts(valid_df)):
+            folium.Marker(
+                [lat, lon],
+                popup=folium.Popup(popup_text, max_width=300),
+                icon=folium.Icon(color=color, icon=icon)
+            ).add_to(feature_group)
         
         feature_group.add_to(map_obj)
     
+    def _popup_texts(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        HTML всплывающих подсказок для всех локаций сразу.
+        
+        Строки собираются конкатенацией колонок pandas, а не f-строкой для каждой строки.
+        
+        Args:
+            df: DataFrame с данными о локациях
+            
+        Returns:
+            Массив строк HTML в порядке строк df
+        """
+        name, address, rating, reviews_count = (
+            df[column].fillna(default).astype(str) if column in df.columns
+            else pd.Series(str(default), index=df.index)
+            for column, default in POPUP_FIELDS
+        )
+        
+        popups = ("<b>" + name + "</b><br>Адрес: " + address +
+                  "<br>Рейтинг: " + rating + "<br>Отзывы: " + reviews_count)
+        return popups.to_numpy()
+    
     def _add_layer_control(self, map_obj: folium.Map) -> None:
         """
         Добавление контроля слоев на карту.
@@ -3,10 +3,10 @@
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
-from jinja2 import Template
+
+# Библиотеки графиков и шаблонов (matplotlib, seaborn, jinja2) импортируются в методах,
+# которые их используют: запуск анализа не ждет их загрузки
 
 class ReportGenerator:
     def __init__(self, config):
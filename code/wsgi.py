@@ -0,0 +1,36 @@
+"""
+WSGI-точка входа сервиса моделей.
+
+Запуск: gunicorn -w 4 --threads 2 wsgi:app
+Модели загружаются в каждом рабочем процессе при первом запросе: сессии onnxruntime
+и LightGBM используют пулы потоков OpenMP, которые нельзя переносить через fork.
+Потоки пакетной обработки запросов также создаются лениво, уже в рабочих процессах.
+"""
+
+import os
+import threading
+from models.model_serving import app, model_server
+
+# Директория с обученными моделями
+MODELS_DIR = os.environ.get('MODELS_DIR', 'models')
+
+# Модели, которые обслуживает API
+SERVED_MODELS = ['coverage_predictor', 'location_recommender', 'location_recommender_centroids']
+
+# Процесс, в котором модели уже загружены (None - еще не загружались)
+_loaded_pid = None
+_load_lock = threading.Lock()
+
+@app.before_request
+def load_models():
+    """Загрузка моделей при первом запросе в текущем процессе"""
+    global _loaded_pid
+    if _loaded_pid == os.getpid():
+        return
+    
+    with _load_lock:
+        if _loaded_pid != os.getpid():
+            for model_name in SERVED_MODELS:
+                if any(os.path.exists(f"{MODELS_DIR}/{model_name}{ext}") for ext in ('.pkl', '.onnx')):
+                    model_server.load_model(MODELS_DIR, model_name)
+            _loaded_pid = os.getpid()
@@ -4,66 +4,147 @@
 Запуск: python scripts/init_data_structure.py
 """
 
+import argparse
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 
-def create_data_structure():
-    """Создание структуры каталогов для данных"""
-    
-    # Основные директории
-    directories = [
-        'data/raw/links/tele2',
-        'data/raw/links/mts',
-        'data/raw/links/beeline',
-        'data/raw/links/megafon',
-        'data/raw/parsed/tele2',
-        'data/raw/parsed/mts',
-        'data/raw/parsed/beeline',
-        'data/raw/parsed/megafon',
-        'data/processed/combined',
-        'data/processed/combined/city_stats',
-        'data/processed/cleaned',
-        'data/processed/cleaned/features',
-        'data/processed/cleaned/aggregated',
-        'data/processed/cleaned/time_series',
-        'data/external/population/cities',
-        'data/external/population/districts',
-        'data/external/economic/income',
-        'data/external/economic/retail',
-        'data/external/economic/business',
-        'data/external/geographic/coordinates',
-        'data/external/geographic/infrastructure',
-        'data/external/geographic/geo_json/city_borders',
-        'data/external/geographic/geo_json/district_borders',
-        'data/external/market/telecom',
-        'data/external/market/general'
+# Максимальное число потоков для файловых операций (ожидание системных вызовов перекрывается)
+MAX_IO_WORKERS = 8
+
+# Содержимое файлов .gitkeep (закодировано один раз)
+GITKEEP_PAYLOAD = '# Этот файл нужен для сохранения структуры каталогов в Git'.encode('utf-8')
+
+# README файлы данных (содержимое закодировано один раз)
+README_FILES = {
+    'data/README.md': '# Данные проекта анализа дистрибуции Т2\n\nОписание структуры данных...'.encode('utf-8'),
+    'data/external/README.md': '# Внешние данные\n\nОписание необходимых внешних данных...'.encode('utf-8')
+}
+
+# Файл-метка завершенной инициализации
+STRUCTURE_SENTINEL = 'data/.structure_initialized'
+
+def _leaf_directories(directories):
+    """Директории, не являющиеся родительскими для других директорий списка"""
+    # При сортировке по компонентам пути вложенные директории идут сразу за родительской
+    ordered = sorted(directories, key=lambda directory: directory.split('/'))
+    return [
+        directory for directory, next_directory in zip(ordered, ordered[1:] + [None])
+        if next_directory is None or not next_directory.startswith(directory + '/')
     ]
+
+# Основные директории
+DATA_DIRECTORIES = (
+    'data/raw/links/tele2',
+    'data/raw/links/mts',
+    'data/raw/links/beeline',
+    'data/raw/links/megafon',
+    'data/raw/parsed/tele2',
+    'data/raw/parsed/mts',
+    'data/raw/parsed/beeline',
+    'data/raw/parsed/megafon',
+    'data/processed/combined',
+    'data/processed/combined/city_stats',
+    'data/processed/cleaned',
+    'data/processed/cleaned/features',
+    'data/processed/cleaned/aggregated',
+    'data/processed/cleaned/time_series',
+    'data/external/population/cities',
+    'data/external/population/districts',
+    'data/external/economic/income',
+    'data/external/economic/retail',
+    'data/external/economic/business',
+    'data/external/geographic/coordinates',
+    'data/external/geographic/infrastructure',
+    'data/external/geographic/geo_json/city_borders',
+    'data/external/geographic/geo_json/district_borders',
+    'data/external/market/telecom',
+    'data/external/market/general'
+)
+
+# Конечные директории (вычисляются один раз при импорте)
+LEAF_DIRECTORIES = tuple(_leaf_directories(DATA_DIRECTORIES))
+
+# Все директории вместе с родительскими, по возрастанию глубины: к созданию директории
+# ее родительская уже существует, и каждая директория создается одним вызовом mkdir
+ALL_DIRECTORIES = tuple(sorted(
+    {'/'.join(parts[:depth]) for parts in (directory.split('/') for directory in DATA_DIRECTORIES)
+     for depth in range(1, len(parts) + 1)},
+    key=lambda directory: (directory.count('/'), directory)
+))
+
+def _make_directory(directory):
+    """Создание директории (None, если уже существует; родительская уже должна существовать)"""
+    # Существующая директория дает FileExistsError - без предварительной проверки, как в os.makedirs
+    try:
+        os.mkdir(directory)
+    except FileExistsError:
+        return None
+    return directory
+
+def _write_gitkeep(directory):
+    """Создание файла .gitkeep в директории (None, если файл уже существует)"""
+    gitkeep_path = f"{directory}/.gitkeep"
+    # Запись одним системным вызовом, без буферизованного текстового файла;
+    # при повторном запуске существующий файл не перезаписывается
+    try:
+        fd = os.open(gitkeep_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return None
+    try:
+        os.write(fd, GITKEEP_PAYLOAD)
+    finally:
+        os.close(fd)
+    return gitkeep_path
+
+def create_data_structure(verbose=False):
+    """Создание структуры каталогов для данных (verbose - перечислить созданные пути)"""
     
-    # Создание директорий
-    for directory in directories:
-        os.makedirs(directory, exist_ok=True)
-        print(f"Создана директория: {directory}")
+    # Структура уже создана предыдущим запуском: один stat вместо всех файловых операций
+    # (для повторной инициализации нужно удалить файл-метку)
+    if os.path.isfile(STRUCTURE_SENTINEL):
+        print(f"Структура данных уже создана (удалите {STRUCTURE_SENTINEL} для повторной инициализации)")
+        return
     
-    # Создание README файлов
-    readme_files = {
-        'data/README.md': '# Данные проекта анализа дистрибуции Т2\n\nОписание структуры данных...',
-        'data/external/README.md': '# Внешние данные\n\nОписание необходимых внешних данных...'
-    }
+    # Созданные директории и файлы (выводятся одним вызовом print в конце)
+    created_directories = []
+    created_files = []
     
-    for file_path, content in readme_files.items():
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"Создан файл: {file_path}")
+    # Создание директорий по уровням глубины (директории одного уровня - параллельно)
+    with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as executor:
+        for _, level in groupby(ALL_DIRECTORIES, key=lambda directory: directory.count('/')):
+            created_directories.extend(directory for directory in executor.map(_make_directory, level)
+                                       if directory is not None)
     
-    # Создание .gitkeep файлов
-    for directory in directories:
-        gitkeep_path = os.path.join(directory, '.gitkeep')
-        with open(gitkeep_path, 'w') as f:
-            f.write('# Этот файл нужен для сохранения структуры каталогов в Git')
-        print(f"Создан файл: {gitkeep_path}")
+    # Создание .gitkeep файлов (родительские директории сохраняются в Git через вложенные)
+    with ThreadPoolExecutor(max_workers=min(MAX_IO_WORKERS, len(LEAF_DIRECTORIES))) as executor:
+        gitkeep_paths = list(executor.map(_write_gitkeep, LEAF_DIRECTORIES))
+    created_files.extend(gitkeep_path for gitkeep_path in gitkeep_paths if gitkeep_path is not None)
     
-    print("\nСтруктура данных создана успешно!")
-    print("Не забудьте добавить внешние данные в data/external/")
+    # Создание README файлов (одна запись в файл)
+    for file_path, content in README_FILES.items():
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, content)
+        finally:
+            os.close(fd)
+        created_files.append(file_path)
+    
+    # Файл-метка создается после всех директорий и файлов
+    os.close(os.open(STRUCTURE_SENTINEL, os.O_WRONLY | os.O_CREAT, 0o644))
+    
+    if verbose:
+        summary = ([f"Создана директория: {directory}" for directory in created_directories] +
+                   [f"Создан файл: {file_path}" for file_path in created_files])
+    else:
+        summary = [f"Создано директорий: {len(created_directories)}, файлов: {len(created_files)}"]
+    summary += ["", "Структура данных создана успешно!", "Не забудьте добавить внешние данные в data/external/"]
+    print("\n".join(summary))
 
 if __name__ == "__main__":
-    create_data_structure()
+    parser = argparse.ArgumentParser(description='Инициализация структуры данных проекта')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Вывести все созданные пути')
+    
+    args = parser.parse_args()
+    create_data_structure(verbose=args.verbose)